@@ -0,0 +1,110 @@
+"""
+Micro-benchmark of BTXT chunk encoding: lines/sec of the current `BTXTChunk.create` against
+the per-line implementation it replaced (encode_str, count_carriage_returns and a
+conform_byte_string call per NUM CHAR B entry).
+
+Usage:
+    python benchmarks/bench_btxt.py [--lines N] [--width W]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from avc.bytestrings import bs1, bs2, bs3, bs4, footer1, footer2, placeholder  # noqa: E402
+from avc.file import BTXTChunk  # noqa: E402
+from avc.utils import (calculate_and_insert_counts, conform_byte_string, count_carriage_returns,  # noqa: E402
+                       encode_str, encode_u32be, encode_u32le, generate_truncated_uuidv7, reverse_str,
+                       swap_lf_cr, wrap_line)
+
+WORDS = ['INT.', 'EXT.', 'KITCHEN', 'night', 'the', 'a', 'and', 'she', 'looks', 'at', 'him',
+         'silently', 'for', 'a', 'long', 'moment', 'before', 'answering', '—', 'naïve', 'café']
+
+
+def legacy_btxt_create(uuid, txt_lines):
+    # BTXTChunk.create as of pyavc 1.0.19
+    data = bytearray()
+    formatted_lines = []
+    data += reverse_str('BTXT')
+    num_char_a_idx = len(data)
+    data += placeholder
+    num_char_a_start = len(data)
+    data += bs1
+    num_char_d_idx = len(data)
+    data += placeholder
+    num_char_d_start = len(data)
+    for line in txt_lines:
+        stripped_line = line.rstrip('\n').rstrip('\r')
+        swapped = swap_lf_cr(stripped_line)
+        swapped += '\r'
+        formatted_lines.append(swapped)
+        data += encode_str(swapped)
+    num_char_d_end = len(data)
+    data[num_char_d_idx:num_char_d_idx + 4] = encode_u32le(len(data) - num_char_d_start)
+    data += conform_byte_string(encode_u32be(count_carriage_returns(formatted_lines)), 4)
+    running_total = 0
+    for line in txt_lines:
+        running_total += len(line)
+        data += conform_byte_string(encode_u32be(running_total))
+    data += conform_byte_string(bs2)
+    num_char_a_end = len(data)
+    data += reverse_str('Scpt')
+    num_char_c_idx = len(data)
+    data += placeholder
+    num_char_c_start = len(data)
+    data += conform_byte_string(bs3)
+    data += conform_byte_string(footer1)
+    data += conform_byte_string(bs4, 5)
+    data += conform_byte_string(uuid, 8)
+    data += conform_byte_string(footer2)
+    num_char_c_end = len(data)
+    calculate_and_insert_counts(data, num_char_a_start, num_char_a_end, num_char_a_idx)
+    calculate_and_insert_counts(data, num_char_d_start, num_char_d_end, num_char_d_idx)
+    calculate_and_insert_counts(data, num_char_c_start, num_char_c_end, num_char_c_idx)
+    return data
+
+
+def make_lines(count, width, seed=0):
+    rng = random.Random(seed)
+    lines = []
+    while len(lines) < count:
+        lines.extend(wrap_line(' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 80))), width))
+    return lines[:count]
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=500000, help="Number of wrapped lines to encode.")
+    parser.add_argument('--width', type=int, default=80, help="Wrap width used to generate the lines.")
+    parser.add_argument('--repeat', type=int, default=3, help="Best-of repetitions.")
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.width)
+    uuid = generate_truncated_uuidv7()
+
+    legacy_time, legacy = best_of(args.repeat, lambda: legacy_btxt_create(uuid, lines))
+    current_time, current = best_of(args.repeat, lambda: BTXTChunk(uuid, lines).create())
+    if legacy != current:
+        raise SystemExit("BTXTChunk output differs from the legacy implementation")
+
+    print(f"{'implementation':<16}{'seconds':>9}{'lines/sec':>14}")
+    print(f"{'legacy':<16}{legacy_time:>9.3f}{args.lines / legacy_time:>14,.0f}")
+    print(f"{'current':<16}{current_time:>9.3f}{args.lines / current_time:>14,.0f}")
+    print(f"speedup: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
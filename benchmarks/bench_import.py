@@ -0,0 +1,63 @@
+"""
+Measure the cold-start cost of importing pyavc for a TXT-only job.
+
+Each sample runs in a fresh interpreter, so the numbers include everything a single
+`pyavc` invocation pays before any conversion work starts. The bare interpreter
+startup is measured alongside so the pyavc share can be read off directly.
+
+Usage:
+    python benchmarks/bench_import.py [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+
+CASES = [
+    ('interpreter', 'pass'),
+    ('import avc.core', 'import avc.core'),
+    ('import avc.cli', 'import avc.cli'),
+    ('import avc.docx_utils', 'import avc.docx_utils'),
+]
+
+HEAVY_MODULES = ('docx', 'lxml')
+
+
+def time_snippet(snippet, runs):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', snippet], env=env, check=True)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def heavy_modules_loaded(snippet):
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    probe = (f"{snippet}\nimport sys\n"
+             f"print(','.join(sorted(m for m in sys.modules if m.split('.')[0] in {HEAVY_MODULES!r})))")
+    output = subprocess.run([sys.executable, '-c', probe], env=env, check=True,
+                            stdout=subprocess.PIPE, universal_newlines=True).stdout.strip()
+    return output.split(',') if output else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20, help="Number of fresh interpreters per case.")
+    args = parser.parse_args()
+
+    print(f"{'case':<24}{'min ms':>10}{'median ms':>12}  heavy modules loaded")
+    for name, snippet in CASES:
+        samples = time_snippet(snippet, args.runs)
+        loaded = heavy_modules_loaded(snippet)
+        print(f"{name:<24}{min(samples) * 1000:>10.1f}{statistics.median(samples) * 1000:>12.1f}  "
+              f"{len(loaded) if loaded else 'none'}")
+
+
+if __name__ == '__main__':
+    main()
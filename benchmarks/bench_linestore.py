@@ -0,0 +1,72 @@
+"""
+Memory held by a wrapped transcript kept as a list of str against the same lines in a `LineStore`.
+
+A synthetic transcript is wrapped at the given width and the lines are kept both ways; the
+traced allocation of each is reported, together with the time to build it and to write the
+BTXT chunk from it.
+
+Usage:
+    python benchmarks/bench_linestore.py [--size-mb N] [--width W]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir, 'src'))
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+from avc.file import BTXTChunk  # noqa: E402
+from avc.linestore import LineStore  # noqa: E402
+from avc.utils import generate_truncated_uuidv7, wrap_line  # noqa: E402
+
+
+def iter_wrapped(paragraphs, width):
+    for paragraph in paragraphs:
+        yield from wrap_line(paragraph, width)
+
+
+def measure(build, paragraphs, width, uuid):
+    tracemalloc.start()
+    start = time.perf_counter()
+    lines = build(iter_wrapped(paragraphs, width))
+    elapsed = time.perf_counter() - start
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    chunk = BTXTChunk(uuid, lines)
+    data = chunk.create()
+    write_elapsed = time.perf_counter() - start
+    return held, peak, elapsed, write_elapsed, chunk.num_lines, bytes(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=20, help="Size of the synthetic transcript.")
+    parser.add_argument('--width', type=int, default=80, help="Wrap width.")
+    args = parser.parse_args()
+
+    paragraphs = list(synthetic.iter_paragraphs(int(args.size_mb * 1024 * 1024)))
+    stores = [
+        ('list of str', list),
+        ('LineStore', LineStore.from_lines),
+    ]
+
+    uuid = generate_truncated_uuidv7()
+    results = {}
+    print(f"{'store':<14}{'held MB':>10}{'peak MB':>10}{'build s':>10}{'write s':>10}{'lines':>11}")
+    for name, build in stores:
+        held, peak, elapsed, write_elapsed, count, data = measure(build, paragraphs, args.width, uuid)
+        results[name] = (held, data)
+        print(f"{name:<14}{held / 1024 ** 2:>10.1f}{peak / 1024 ** 2:>10.1f}{elapsed:>10.2f}{write_elapsed:>10.2f}{count:>11}")
+
+    (list_held, list_data), (store_held, store_data) = results.values()
+    print(f"\nLineStore holds {list_held / store_held:.1f}x less memory; identical BTXT chunk: {list_data == store_data}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Compare the shared wrapping engine (`avc.utils.wrap_line`) with the two wrappers it replaced.
+
+Two synthetic inputs are generated: a transcript-like text of many short paragraphs and a
+text made of a few very long paragraphs. Both are wrapped line by line, the way the TXT and
+DOCX paths feed the wrapper.
+
+Usage:
+    python benchmarks/bench_wrap.py [--size-mb N] [--width W]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from avc.utils import wrap_line  # noqa: E402
+
+WORDS = ['INT.', 'EXT.', 'KITCHEN', 'night', 'the', 'a', 'and', 'she', 'looks', 'at', 'him',
+         'silently', 'for', 'a', 'long', 'moment', 'before', 'answering', '—', 'naïve', 'café']
+
+
+def legacy_wrap_txt_file_line(line, line_width=80):
+    # utils.wrap_txt_file_line as of pyavc 1.0.19
+    wrapped_lines = []
+    current_line = ""
+    for word in line.split():
+        if len(current_line) + len(word) + (1 if current_line else 0) <= line_width:
+            if current_line:
+                current_line += " "
+            current_line += word
+        else:
+            wrapped_lines.append(current_line)
+            current_line = word
+    if current_line:
+        wrapped_lines.append(current_line)
+    elif not wrapped_lines:
+        wrapped_lines.append('')
+    return wrapped_lines
+
+
+def legacy_wrap_text(text, width=80):
+    # docx_utils.wrap_text as of pyavc 1.0.19
+    wrapped_lines = []
+    for line in text.splitlines():
+        current_line = ""
+        for word in line.split():
+            if len(current_line) + len(word) + 1 <= width:
+                if current_line:
+                    current_line += " "
+                current_line += word
+            else:
+                wrapped_lines.append(current_line)
+                current_line = word
+        wrapped_lines.append(current_line)
+    return wrapped_lines
+
+
+def make_text(size, words_per_paragraph, seed=0):
+    rng = random.Random(seed)
+    paragraphs = []
+    total = 0
+    while total < size:
+        paragraph = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, words_per_paragraph)))
+        paragraphs.append(paragraph)
+        total += len(paragraph) + 1
+    return paragraphs
+
+
+def run(name, func, paragraphs, width):
+    start = time.perf_counter()
+    count = 0
+    for paragraph in paragraphs:
+        count += len(func(paragraph, width))
+    return time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=10, help="Size of each synthetic input.")
+    parser.add_argument('--width', type=int, default=80, help="Wrap width.")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    inputs = [
+        ('short paragraphs', make_text(size, 60)),
+        ('long paragraphs', make_text(size, 200000)),
+    ]
+    wrappers = [
+        ('legacy wrap_txt_file_line', legacy_wrap_txt_file_line),
+        ('legacy wrap_text', legacy_wrap_text),
+        ('wrap_line', wrap_line),
+    ]
+
+    print(f"{'input':<18}{'wrapper':<28}{'seconds':>9}{'MB/s':>9}{'lines':>11}")
+    for input_name, paragraphs in inputs:
+        for wrapper_name, func in wrappers:
+            elapsed, count = run(wrapper_name, func, paragraphs, args.width)
+            print(f"{input_name:<18}{wrapper_name:<28}{elapsed:>9.2f}{args.size_mb / elapsed:>9.1f}{count:>11}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Reproducible benchmark suite for pyavc.
+
+Synthetic TXT and DOCX scripts are generated at each size, and every stage is timed at every
+text width:
+
+    read     reading the input into paragraphs (TXT lines / DOCX paragraphs)
+    wrap     wrapping those paragraphs into lines
+    encode   encoding the lines into a BTXT chunk (to a null sink)
+    convert  avc.core.convert end to end, including the disk write
+
+plus the cold-start time of a `pyavc` CLI invocation on a 1KB script. Each measurement runs
+in a fresh interpreter, so the reported peak RSS covers that stage alone (for wrap and encode,
+together with the input prepared for it). The results are written as JSON so runs against
+different versions can be compared.
+
+Usage:
+    python benchmarks/suite.py [--sizes 1KB,1MB,10MB] [--widths 40,80,120] [--formats txt,docx]
+                               [--stages read,wrap,encode,convert] [--repeat 3] [--output results.json]
+    python benchmarks/suite.py --full      # 1KB to 200MB
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(HERE, os.pardir, 'src')
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, HERE)
+
+import synthetic  # noqa: E402
+
+DEFAULT_SIZES = '1KB,100KB,1MB,10MB'
+FULL_SIZES = '1KB,100KB,1MB,10MB,100MB,200MB'
+STAGES = ('read', 'wrap', 'encode', 'convert')
+UNITS = {'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+class NullSink:
+    """A seekable binary sink that discards everything, so encoding is timed without disk I/O."""
+
+    def __init__(self):
+        self.position = 0
+        self.size = 0
+
+    def write(self, data):
+        self.position += len(data)
+        self.size = max(self.size, self.position)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def seek(self, position, whence=0):
+        self.position = position if whence == 0 else (self.position + position if whence == 1 else self.size + position)
+        return self.position
+
+    def seekable(self):
+        return True
+
+
+def read_paragraphs(path, input_format):
+    from avc.formats import get_format
+    return list(get_format(input_format).read(path))
+
+
+def wrap_paragraphs(paragraphs, input_format, width):
+    # The wrapper the conversion itself uses for the format (DOCX keeps its line-break handling)
+    from avc.formats import get_format
+    return list(get_format(input_format).wrap(paragraphs, width))
+
+
+def run_stage(stage, path, input_format, width):
+    """Time one stage in this process. Returns (seconds, line count)."""
+    from avc.core import convert
+    from avc.file import BTXTChunk
+    from avc.utils import generate_truncated_uuidv7
+
+    # Inputs for the stage are prepared outside the timed region
+    paragraphs = read_paragraphs(path, input_format) if stage in ('wrap', 'encode') else None
+    lines = wrap_paragraphs(paragraphs, input_format, width) if stage == 'encode' else None
+    output_dir = tempfile.mkdtemp() if stage == 'convert' else None
+
+    start = time.perf_counter()
+    if stage == 'read':
+        count = len(read_paragraphs(path, input_format))
+    elif stage == 'wrap':
+        count = len(wrap_paragraphs(paragraphs, input_format, width))
+    elif stage == 'encode':
+        chunk = BTXTChunk(generate_truncated_uuidv7(), lines)
+        chunk.write(NullSink())
+        count = chunk.num_lines
+    else:
+        # Progress messages are logged (to stderr); keep them out of the benchmark output
+        logging.getLogger('avc').setLevel(logging.WARNING)
+        convert(path, output_dir, text_width=width)
+        count = None
+    elapsed = time.perf_counter() - start
+
+    if output_dir:
+        shutil.rmtree(output_dir)
+    return elapsed, count
+
+
+def worker(argv):
+    stage, path, input_format, width = argv[0], argv[1], argv[2], int(argv[3])
+    elapsed, count = run_stage(stage, path, input_format, width)
+    print(json.dumps({'seconds': elapsed, 'lines': count, 'peak_rss_kb': peak_rss_kb()}))
+
+
+def measure(stage, path, input_format, width, repeat):
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', stage, path, input_format, str(width)],
+                                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        samples.append(json.loads(output))
+    best = min(samples, key=lambda sample: sample['seconds'])
+    return {
+        'seconds': best['seconds'],
+        'median_seconds': statistics.median(sample['seconds'] for sample in samples),
+        'lines': best['lines'],
+        'peak_rss_kb': max(sample['peak_rss_kb'] or 0 for sample in samples) or None,
+    }
+
+
+def measure_cli_cold_start(work_dir, repeat):
+    input_path = os.path.join(work_dir, 'cold_start.txt')
+    synthetic.write_txt(input_path, 1024)
+    env = dict(os.environ, PYTHONPATH=SRC_DIR)
+    samples = []
+    for _ in range(repeat):
+        output_dir = tempfile.mkdtemp(dir=work_dir)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'from avc.cli import main; main()', '-i', input_path, '-o', output_dir],
+                       check=True, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return {'input': 'txt', 'size_bytes': 1024, 'seconds': min(samples), 'median_seconds': statistics.median(samples)}
+
+
+def pyavc_version():
+    import avc
+    return avc.__version__
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        return worker(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Comma-separated input sizes, e.g. 1KB,10MB.")
+    parser.add_argument('--full', action='store_true', help=f"Use the full size range ({FULL_SIZES}).")
+    parser.add_argument('--widths', default='40,80,120', help="Comma-separated text widths.")
+    parser.add_argument('--formats', default='txt,docx', help="Comma-separated input formats.")
+    parser.add_argument('--stages', default=','.join(STAGES), help="Comma-separated stages to run.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the fastest is reported.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed for the synthetic scripts.")
+    parser.add_argument('--output', help="Write the JSON results here instead of stdout.")
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in (FULL_SIZES if args.full else args.sizes).split(',')]
+    widths = [int(width) for width in args.widths.split(',')]
+    formats = args.formats.split(',')
+    stages = args.stages.split(',')
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='pyavc-bench-')
+    try:
+        for input_format in formats:
+            for size in sizes:
+                path = os.path.join(work_dir, f'script_{size}.{input_format}')
+                synthetic.WRITERS[input_format](path, size, args.seed)
+                file_size = os.path.getsize(path)
+                for stage in stages:
+                    # Reading doesn't depend on the width
+                    for width in (widths[:1] if stage == 'read' else widths):
+                        result = measure(stage, path, input_format, width, args.repeat)
+                        result.update({
+                            'stage': stage,
+                            'format': input_format,
+                            'size_bytes': size,
+                            'file_bytes': file_size,
+                            'text_width': None if stage == 'read' else width,
+                            'mb_per_s': (size / 1024 ** 2) / result['seconds'] if result['seconds'] else None,
+                        })
+                        results.append(result)
+                        print(f"{input_format:>5} {size:>11} {stage:>8} w={width:<4} {result['seconds']:9.3f}s "
+                              f"{result['mb_per_s'] or 0:8.1f} MB/s  rss={result['peak_rss_kb']} KB", file=sys.stderr)
+                os.remove(path)
+
+        cli = measure_cli_cold_start(work_dir, max(args.repeat, 5))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'pyavc_version': pyavc_version(),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'seed': args.seed,
+        'results': results,
+        'cli_cold_start': cli,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Deterministic synthetic scripts for benchmarking.
+
+TXT and DOCX files are generated paragraph by paragraph and streamed to disk, so even the
+200MB inputs never need to fit in memory. The DOCX is a minimal WordprocessingML package
+written directly with zipfile; python-docx is not needed to generate it.
+"""
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+WORDS = ['INT.', 'EXT.', 'KITCHEN', 'DAY', 'NIGHT', 'SARAH', 'TOM', '(V.O.)', 'the', 'a', 'and', 'she',
+         'looks', 'at', 'him', 'silently', 'for', 'long', 'moment', 'before', 'answering', 'what',
+         'do', 'you', 'mean', 'naïve', 'café', '—', '…', '“Wait.”', 'it’s', 'over', 'door', 'opens']
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+
+DOCUMENT_END = '<w:sectPr/></w:body></w:document>'
+
+
+def iter_paragraphs(size, seed=0):
+    """
+    Yield screenplay-like paragraphs until about `size` characters have been produced.
+
+    A mix of short lines (sluglines, character cues, blank lines) and long action/dialogue
+    paragraphs exercises both the per-line overhead and the wrapping.
+    """
+    rng = random.Random(seed)
+    produced = 0
+    while produced < size:
+        kind = rng.random()
+        if kind < 0.1:
+            paragraph = ''
+        elif kind < 0.35:
+            paragraph = ' '.join(rng.choice(WORDS).upper() for _ in range(rng.randint(1, 4)))
+        else:
+            paragraph = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 120)))
+        produced += len(paragraph) + 1
+        yield paragraph
+
+
+def write_txt(path, size, seed=0):
+    with open(path, 'w', encoding='utf-8') as fp:
+        for paragraph in iter_paragraphs(size, seed):
+            fp.write(paragraph)
+            fp.write('\n')
+
+
+def write_docx(path, size, seed=0):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', PACKAGE_RELS)
+        with archive.open('word/document.xml', 'w', force_zip64=True) as fp:
+            fp.write(DOCUMENT_START.encode('utf-8'))
+            for paragraph in iter_paragraphs(size, seed):
+                if paragraph:
+                    xml = f'<w:p><w:r><w:t xml:space="preserve">{escape(paragraph)}</w:t></w:r></w:p>'
+                else:
+                    xml = '<w:p/>'
+                fp.write(xml.encode('utf-8'))
+            fp.write(DOCUMENT_END.encode('utf-8'))
+
+
+WRITERS = {
+    'txt': write_txt,
+    'docx': write_docx,
+}
@@ -1,5 +1,7 @@
 # src/__init__.py
 
+__version__ = '1.0.19'
+
 from . import core
 
 __all__ = ['core.convert']
@@ -0,0 +1,97 @@
+import asyncio
+from .core import ConversionResult, convert_file, _validate_input, _validate_output_dir
+from .file import AVCFile
+
+# get_running_loop is Python 3.7+; inside a coroutine, get_event_loop returns the same loop on 3.6
+_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+def _create(filepath, output_dir, output_name, text_width, cache, stats, substitutions):
+    # Runs in the executor; module level so it can be sent to process pools. The stats are
+    # returned because a process pool fills in a copy of them
+    output_path = AVCFile(filepath, output_dir, output_name, text_width, cache=cache, stats=stats,
+                          substitutions=substitutions).create()
+    return output_path, stats
+
+
+async def convert_async(filepath, output_dir, output_name=None, text_width=80, executor=None, cache=None, stats=None,
+                        substitutions=None):
+    """
+    Convert a DOCX or TXT file without blocking the event loop.
+
+    Parsing, wrapping, encoding and the file write all run in `executor`. Conversion is
+    CPU-bound, so a ProcessPoolExecutor keeps one large document from holding the GIL
+    against the rest of the service; the default is the loop's thread pool.
+
+    Cancelling the returned coroutine cancels the conversion if it hasn't started yet. A
+    conversion that is already running finishes in the background and its result is discarded.
+
+    Args:
+        filepath (str): The input DOCX or TXT file.
+        output_dir (str): The directory the .avc file is written to.
+        output_name (str): Optional output name (without extension).
+        text_width (int): The maximum line width used when wrapping text.
+        executor (concurrent.futures.Executor): Where the conversion runs. Defaults to the loop's executor.
+        cache (ConversionCache): Optional cache of encoded bodies to read from and fill.
+        stats (ConversionStats): Optional stats object filled in by the conversion.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        str: The path of the created .avc file.
+    """
+    _validate_input(filepath)
+    _validate_output_dir(output_dir)
+
+    loop = _running_loop()
+    output_path, filled = await loop.run_in_executor(executor, _create, filepath, output_dir, output_name, text_width,
+                                                     cache, stats, substitutions)
+    if stats is not None and filled is not stats:
+        vars(stats).update(vars(filled))
+    return output_path
+
+
+async def convert_many_async(paths, output_dir, text_width=80, max_concurrency=4, executor=None, cache=None,
+                             collect_stats=False, substitutions=None):
+    """
+    Convert several files without blocking the event loop, with at most `max_concurrency` in flight.
+
+    Errors are collected per file as with `core.convert_many`. Cancelling the batch cancels
+    every conversion that hasn't started yet.
+
+    Args:
+        paths (iterable of str): The input files to convert.
+        output_dir (str): The directory the .avc files are written to.
+        text_width (int): The maximum line width used when wrapping text.
+        max_concurrency (int): The maximum number of conversions submitted to the executor at once.
+        executor (concurrent.futures.Executor): Where the conversions run. Defaults to the loop's executor.
+        cache (ConversionCache): Optional cache of encoded bodies, shared by all conversions.
+        collect_stats (bool): Attach each file's stats to its result.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        list of ConversionResult: One result per input, in the same order as `paths`.
+    """
+    _validate_output_dir(output_dir)
+
+    loop = _running_loop()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def convert_one(filepath):
+        # Only take an executor slot once we're allowed to, so queued files don't pile up in the pool
+        async with semaphore:
+            try:
+                return await loop.run_in_executor(executor, convert_file, filepath, output_dir, None, text_width,
+                                                  cache, collect_stats, substitutions)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # e.g. a broken process pool; keep the batch going and report it against this file
+                return ConversionResult(filepath, None, f"{type(e).__name__}: {e}")
+
+    tasks = [asyncio.ensure_future(convert_one(filepath)) for filepath in paths]
+    try:
+        return await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
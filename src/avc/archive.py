@@ -0,0 +1,254 @@
+import io
+import os
+import posixpath
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+from collections import deque
+from .core import ConversionResult, convert_to_bytes
+from .naming import ArchiveNamer
+from .formats import format_from_path
+
+# Archives that can't be read from the end (zip from a pipe) are buffered in memory up to this size
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+# Output archive kinds by extension, as tarfile stream modes ('zip' for zip files)
+ARCHIVE_KINDS = {
+    '.zip': 'zip',
+    '.tar': 'w|',
+    '.tar.gz': 'w|gz',
+    '.tgz': 'w|gz',
+    '.tar.bz2': 'w|bz2',
+    '.tbz2': 'w|bz2',
+    '.tar.xz': 'w|xz',
+    '.txz': 'w|xz',
+}
+
+
+def archive_kind(path):
+    """
+    Return the output archive kind implied by a file name, or None if it isn't an archive.
+
+    Args:
+        path (str): The file name.
+
+    Returns:
+        str or None: 'zip', or a tarfile write mode such as 'w|gz'.
+    """
+    name = os.fspath(path).lower()
+    for extension, kind in sorted(ARCHIVE_KINDS.items(), key=lambda item: -len(item[0])):
+        if name.endswith(extension):
+            return kind
+    return None
+
+
+def _is_script(name):
+    # Skip folders' resource forks and Word's lock files that come along in bundles made on a Mac
+    base = posixpath.basename(name)
+    if name.startswith('__MACOSX/') or base.startswith(('._', '~$')):
+        return False
+    return format_from_path(base) is not None
+
+
+def _iter_zip_members(archive):
+    with archive:
+        for info in archive.infolist():
+            if not info.is_dir() and _is_script(info.filename):
+                yield info.filename, archive.read(info)
+
+
+def _iter_tar_members(archive):
+    with archive:
+        for info in archive:
+            if info.isfile() and _is_script(info.name):
+                yield info.name, archive.extractfile(info).read()
+
+
+def iter_archive_members(source):
+    """
+    Lazily read the script members (.txt, .docx, .fdx, ...) of a zip or tar archive, in archive order.
+
+    A tar archive is read as a stream, one member at a time. A zip archive has its directory at
+    the end, so when it comes from a pipe it is spooled first. Members are only ever held in
+    memory: a DOCX inside a zip is converted straight from its bytes.
+
+    Args:
+        source (str or file object): The archive path, or a readable binary stream.
+
+    Returns:
+        generator of tuple: (member name, member bytes).
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if zipfile.is_zipfile(source):
+            yield from _iter_zip_members(zipfile.ZipFile(source))
+        else:
+            yield from _iter_tar_members(_open_tar(name=source, mode='r:*'))
+        return
+
+    if not (hasattr(source, 'seekable') and source.seekable()):
+        if hasattr(source, 'peek') and not source.peek(4)[:4].startswith(b'PK'):
+            yield from _iter_tar_members(_open_tar(fileobj=source, mode='r|*'))
+            return
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+            shutil.copyfileobj(source, spool)
+            spool.seek(0)
+            yield from iter_archive_members(spool)
+        return
+
+    position = source.tell()
+    is_zip = zipfile.is_zipfile(source)
+    source.seek(position)
+    if is_zip:
+        yield from _iter_zip_members(zipfile.ZipFile(source))
+    else:
+        yield from _iter_tar_members(_open_tar(fileobj=source, mode='r:*'))
+
+
+def _open_tar(**kwargs):
+    try:
+        return tarfile.open(**kwargs)
+    except tarfile.ReadError:
+        raise ValueError("The input is not a zip or tar archive.")
+
+
+class ArchiveWriter:
+    """
+    Writes .avc files into a zip or tar archive as they are converted.
+
+    Member names follow the `AVCFile` naming rules inside the archive (see `ArchiveNamer`),
+    and each member keeps the directory its script had in the input archive. The archive is
+    written as a stream, so `output` may be a pipe.
+
+    Args:
+        output (file object): A writable binary file object.
+        kind (str): 'zip', or a tarfile stream mode such as 'w|gz' (see `ARCHIVE_KINDS`).
+    """
+
+    def __init__(self, output, kind='zip'):
+        self.kind = kind
+        self.namer = ArchiveNamer()
+        if kind == 'zip':
+            self.archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(fileobj=output, mode=kind)
+
+    def add(self, input_name, data):
+        """
+        Add one .avc file, named after the script it was converted from.
+
+        Args:
+            input_name (str): The script's member name in the input archive.
+            data (bytes): The .avc data.
+
+        Returns:
+            str: The member name the .avc file was given.
+        """
+        directory, base = posixpath.split(input_name)
+        # Never carry absolute or parent paths from the input over into the output
+        directory = '/'.join(part for part in directory.split('/') if part not in ('', '.', '..'))
+        name = self.namer.claim(directory, posixpath.splitext(base)[0])
+        if self.kind == 'zip':
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self.archive.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(data))
+        return name
+
+    def close(self):
+        self.archive.close()
+
+
+def _convert_member(job):
+    # Runs inside a worker process: returns (.avc bytes, None) or (None, error)
+    name, data, text_width, substitutions = job
+    try:
+        return convert_to_bytes(data, format_from_path(name), text_width, substitutions=substitutions), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def _iter_converted(jobs_iter, jobs):
+    if jobs == 1:
+        for job in jobs_iter:
+            yield job[0], _convert_member(job)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        try:
+            for job in jobs_iter:
+                pending.append((job[0], executor.submit(_convert_member, job)))
+                # Keep a couple of members per worker in flight, so memory stays bounded
+                if len(pending) >= jobs * 2:
+                    name, future = pending.popleft()
+                    yield name, future.result()
+            while pending:
+                name, future = pending.popleft()
+                yield name, future.result()
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def convert_archive(source, output, text_width=80, jobs=None, substitutions=None, output_kind=None):
+    """
+    Convert every script file (.txt, .docx, .fdx, ...) in a zip or tar archive into .avc files in another archive,
+    without extracting anything to disk.
+
+    Members are converted in worker processes and added to the output in input order. Errors
+    are collected per member instead of being raised, as with `convert_many`.
+
+    Args:
+        source (str or file object): The input archive path, or a readable binary stream.
+        output (str or file object): The output archive path, or a writable binary stream.
+        text_width (int): The maximum line width used when wrapping text.
+        jobs (int): The number of worker processes. Defaults to the number of CPUs; 1 converts in-process.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+        output_kind (str): 'zip' or a tarfile stream mode such as 'w|gz'. Taken from the output
+            path's extension when not given; defaults to 'zip' for streams.
+
+    Returns:
+        list of ConversionResult: One result per script, with the member names of the input and
+        of its .avc file.
+    """
+    if output_kind is None:
+        output_kind = archive_kind(output) if isinstance(output, (str, os.PathLike)) else 'zip'
+        if output_kind is None:
+            raise ValueError(f"Can't tell the archive type of '{output}': use one of {', '.join(ARCHIVE_KINDS)}.")
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, jobs)
+
+    output_file = open(output, 'wb') if isinstance(output, (str, os.PathLike)) else None
+    try:
+        writer = ArchiveWriter(output_file or output, output_kind)
+        results = []
+        try:
+            work = ((name, data, text_width, substitutions) for name, data in iter_archive_members(source))
+            for name, (data, error) in _iter_converted(work, jobs):
+                if error is None:
+                    results.append(ConversionResult(name, writer.add(name, data), None))
+                else:
+                    results.append(ConversionResult(name, None, error))
+        finally:
+            writer.close()
+    except BaseException:
+        if output_file is not None:
+            # Don't leave a partial archive behind
+            output_file.close()
+            os.remove(output)
+        raise
+    if output_file is not None:
+        output_file.close()
+    return results
@@ -0,0 +1,238 @@
+import hashlib
+import io
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from . import __version__
+from .utils import pack_u32le_array
+
+# Entry layout: magic, body length (u64le), line count (u32le), the encoded BTXT body,
+# then the NUM CHAR B offset table as packed u32le values.
+ENTRY_MAGIC = b'PYAVCC01'
+ENTRY_HEADER = struct.Struct('<8sQI')
+ENTRY_SUFFIX = '.btxt'
+
+HASH_BLOCK_SIZE = 1024 * 1024
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+
+class CacheEntry:
+    """
+    A cached, already encoded BTXT body and its NUM CHAR B offset table.
+
+    Used as `BTXTChunk(encoded=...)`: only the header timestamp/UUID and the chunk trailer
+    are regenerated around it.
+    """
+
+    def __init__(self, fp, body_len, offsets):
+        self.fp = fp
+        self.body_len = body_len
+        self.offsets = offsets
+
+    def write_to(self, output):
+        """
+        Copy the encoded body to `output`.
+
+        Args:
+            output (file object): A writable binary file object.
+        """
+        self.fp.seek(ENTRY_HEADER.size)
+        remaining = self.body_len
+        while remaining:
+            block = self.fp.read(min(remaining, HASH_BLOCK_SIZE))
+            if not block:
+                raise EOFError("Truncated cache entry")
+            output.write(block)
+            remaining -= len(block)
+
+    def close(self):
+        self.fp.close()
+
+
+class CacheWriter:
+    """
+    Collects an encoded BTXT body while it is being written to the real output, then publishes
+    it under its key with an atomic rename, so readers never see a partial entry.
+    """
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, prefix='.tmp-', suffix=ENTRY_SUFFIX)
+        self.fp = os.fdopen(fd, 'w+b')
+        self.fp.write(ENTRY_HEADER.pack(ENTRY_MAGIC, 0, 0))
+        self.body_len = 0
+
+    def write(self, body):
+        self.fp.write(body)
+        self.body_len += len(body)
+
+    def commit(self, offsets):
+        """
+        Publish the entry.
+
+        Args:
+            offsets (array): The NUM CHAR B offset table of the body written so far.
+        """
+        self.fp.write(pack_u32le_array(offsets))
+        self.fp.seek(0)
+        self.fp.write(ENTRY_HEADER.pack(ENTRY_MAGIC, self.body_len, len(offsets)))
+        self.fp.close()
+        os.replace(self.tmp_path, self.cache.entry_path(self.key))
+        self.cache.evict()
+
+    def discard(self):
+        self.fp.close()
+        _remove_quietly(self.tmp_path)
+
+
+class ConversionCache:
+    """
+    An opt-in on-disk cache of encoded BTXT bodies, keyed on the input content.
+
+    Keys combine a SHA-256 of the input bytes with the input format, text width and pyavc
+    version, so a change to any of them is a miss. Entries are evicted least-recently-used
+    first (by modification time, refreshed on every hit) once the cache grows past `max_size`.
+
+    Args:
+        directory (str): The cache directory. Created if it doesn't exist.
+        max_size (int): The maximum total size of the entries, in bytes.
+    """
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = os.path.abspath(directory)
+        self.max_size = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def key(self, source, input_format, text_width, substitutions=None):
+        """
+        Return the cache key for an input, or None if the input can't be hashed without
+        consuming it (non-seekable streams).
+
+        Args:
+            source (str, bytes or file object): The input path, bytes or binary stream.
+            input_format (str): The input format.
+            text_width (int): The wrap width.
+            substitutions (Substitutions): The text substitutions applied, if any.
+
+        Returns:
+            str or None: The hex key.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{__version__}\0{input_format}\0{text_width}\0".encode('utf-8'))
+        if substitutions:
+            digest.update(f"{substitutions.fingerprint()}\0".encode('utf-8'))
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            digest.update(source)
+        elif isinstance(source, (str, os.PathLike)):
+            with open(source, 'rb') as fp:
+                _hash_stream(digest, fp)
+        elif isinstance(source, io.TextIOBase):
+            return None
+        elif hasattr(source, 'read') and hasattr(source, 'seekable') and source.seekable():
+            position = source.tell()
+            _hash_stream(digest, source)
+            source.seek(position)
+        else:
+            return None
+
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            CacheEntry or None: The open entry (close it when done), or None on a miss.
+        """
+        path = self.entry_path(key)
+        try:
+            fp = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+
+        try:
+            magic, body_len, num_lines = ENTRY_HEADER.unpack(fp.read(ENTRY_HEADER.size))
+            if magic != ENTRY_MAGIC:
+                raise ValueError("Not a pyavc cache entry")
+            fp.seek(ENTRY_HEADER.size + body_len)
+            offsets = array('I')
+            offsets.frombytes(fp.read(num_lines * 4))
+            if len(offsets) != num_lines:
+                raise EOFError("Truncated cache entry")
+        except (struct.error, ValueError, EOFError):
+            # Damaged entry: drop it and convert from scratch
+            fp.close()
+            _remove_quietly(path)
+            return None
+
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process sharing the cache since it was opened
+            fp.close()
+            return None
+        return CacheEntry(fp, body_len, offsets)
+
+    def writer(self, key):
+        """
+        Start a new entry for `key`.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            CacheWriter: Feed it the encoded body, then `commit` or `discard` it.
+        """
+        return CacheWriter(self, key)
+
+    def evict(self):
+        """
+        Delete least-recently-used entries until the cache is within `max_size`.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(ENTRY_SUFFIX) and not entry.name.startswith('.tmp-'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Already evicted by another process sharing the cache
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            _remove_quietly(path)
+            total -= size
+
+
+def _remove_quietly(path):
+    # Another process sharing the cache may already have removed it
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _hash_stream(digest, fp):
+    while True:
+        block = fp.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block)
@@ -1,18 +1,33 @@
 import sys
 import argparse
+import glob
+import json
+import logging
 import os
 from .file import AVCFile
+from .core import convert_many
+from .formats import detect_format, input_formats, supported_extensions
+from .substitutions import Substitutions, build_substitutions
+
+SMART_QUOTES = Substitutions({
+    '“': '"',  # Left double quotation mark
+    '”': '"',  # Right double quotation mark
+    '‘': "'",  # Left single quotation mark
+    '’': "'",  # Right single quotation mark
+})
 
 def replace_smart_quotes(s):
-    smart_quotes = {
-        '“': '"',  # Left double quotation mark
-        '”': '"',  # Right double quotation mark
-        '‘': "'",  # Left single quotation mark
-        '’': "'",  # Right single quotation mark
-    }
-    for smart, straight in smart_quotes.items():
-        s = s.replace(smart, straight)
-    return s
+    return SMART_QUOTES(s)
+
+def parse_substitution(spec):
+    """
+    Parse a --sub argument of the form FROM=TO.
+    """
+    key, sep, value = spec.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError(f"Expected FROM=TO, got '{spec}'.")
+    return key, value
+
 
 def fix_split_arguments(args):
     fixed_args = []
@@ -47,7 +62,7 @@ def ensure_absolute_path(path):
         path = "/" + path
     return os.path.abspath(path)
 
-def validate_paths(filepath, output_dir):
+def validate_paths(filepath, output_dir, input_format=None):
     filepath = ensure_absolute_path(filepath)
     output_dir = ensure_absolute_path(output_dir)
 
@@ -57,53 +72,407 @@ def validate_paths(filepath, output_dir):
     if not os.path.exists(filepath):
         raise FileNotFoundError(f"The input file '{filepath}' does not exist.")
     
-    if not (filepath.lower().endswith('.txt') or filepath.lower().endswith('.docx')):
-        raise ValueError(f"The input file '{filepath}' must be a .txt or .docx file.")
+    if input_format is None and detect_format(filepath) is None:
+        raise ValueError(f"The input file '{filepath}' must be one of {', '.join(supported_extensions())}.")
     
     if not os.path.exists(output_dir):
         raise NotADirectoryError(f"The output directory '{output_dir}' does not exist or is not a directory.")
 
     return filepath, output_dir
 
+def expand_batch_inputs(spec, extensions=None):
+    """
+    Resolve a --batch argument (a directory or a glob pattern) into a sorted list of files with one of `extensions`
+    (by default, those of every registered input format).
+    """
+    if extensions is None:
+        extensions = supported_extensions()
+    spec = ensure_absolute_path(spec)
+
+    if os.path.isdir(spec):
+        candidates = [os.path.join(spec, name) for name in os.listdir(spec)]
+    else:
+        candidates = glob.glob(spec)
+
+    paths = sorted(path for path in candidates
+                   if os.path.isfile(path) and path.lower().endswith(extensions))
+    if not paths:
+        kinds = " or ".join(extensions)
+        raise FileNotFoundError(f"No {kinds} files matched '{spec}'.")
+    return paths
+
+def format_stats(stats):
+    """
+    Format a `ConversionStats.as_dict()` as a single human-readable line.
+    """
+    stages = "  ".join(f"{stage} {seconds:.3f}s" for stage, seconds in sorted(stats['durations'].items()))
+    cache = "  cache hit" if stats['cache_hit'] else ""
+    return (f"{stats['input_path'] or '-'}: {stats['total_seconds']:.3f}s  ({stages})  "
+            f"{stats['bytes_in']} bytes in, {stats['bytes_out']} bytes out, {stats['lines']} lines{cache}")
+
+def print_stats(stats_list, stats_format, file=None):
+    if stats_format == 'json':
+        print(json.dumps(stats_list[0] if len(stats_list) == 1 else stats_list, indent=2), file=file)
+    else:
+        for stats in stats_list:
+            print(format_stats(stats), file=file)
+
+def run_batch(spec, output_dir, text_width, jobs, cache=None, stats_format=None, substitutions=None):
+    output_dir = ensure_absolute_path(output_dir)
+    if not os.path.isdir(output_dir):
+        raise NotADirectoryError(f"The output directory '{output_dir}' does not exist or is not a directory.")
+
+    results = convert_many(expand_batch_inputs(spec), output_dir, text_width, jobs, cache,
+                           collect_stats=stats_format is not None, substitutions=substitutions)
+    if stats_format:
+        print_stats([result.stats for result in results if result.ok], stats_format)
+
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        print(f"Error: {result.input_path}: {result.error}", file=sys.stderr)
+    print(f"Converted {len(results) - len(failed)} of {len(results)} files.", file=sys.stderr)
+    return not failed
+
+def watch_main(argv):
+    parser = argparse.ArgumentParser(prog="pyavc watch", description="Watch a folder and convert new or modified DOCX/TXT files as they are saved.")
+    parser.add_argument('input_dir', help="Folder to watch.")
+    parser.add_argument('output_dir', help="Folder the .avc files are written to.")
+    parser.add_argument('-t', '--text_width', type=int, default=80, help="Int: Optional max chars before line break is inserted")
+    parser.add_argument('-j', '--jobs', type=int, help="Int: Number of worker processes (default: number of CPUs).")
+    parser.add_argument('--interval', type=float, default=0.25, help="Float: Seconds between folder scans (default: 0.25).")
+    parser.add_argument('--debounce', type=float, default=0.3, help="Float: Seconds a file must stay unchanged before it is converted (default: 0.3).")
+    args = parser.parse_args(argv)
+
+    input_dir = ensure_absolute_path(args.input_dir)
+    output_dir = ensure_absolute_path(args.output_dir)
+    for path in (input_dir, output_dir):
+        if not os.path.isdir(path):
+            print(f"Error: The directory '{path}' does not exist or is not a directory.", file=sys.stderr)
+            sys.exit(1)
+
+    def report(input_path, output_path, error):
+        if error:
+            print(f"Error: {input_path}: {error}", file=sys.stderr)
+        else:
+            print(f"Converted '{input_path}' to '{output_path}'.")
+
+    from .watch import Watcher
+    watcher = Watcher(input_dir, output_dir, args.text_width, args.jobs, args.interval, args.debounce, on_result=report)
+    print(f"Watching '{input_dir}' (Ctrl+C to stop).")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+def serve_main(argv):
+    from .server import DEFAULT_HOST, DEFAULT_PORT
+
+    parser = argparse.ArgumentParser(prog="pyavc serve", description="Keep warm worker processes and convert DOCX/TXT files on request over HTTP.")
+    parser.add_argument('--socket', help="Path of a Unix socket to listen on instead of a TCP port.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"Host to listen on (default: {DEFAULT_HOST}).")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Int: Port to listen on (default: {DEFAULT_PORT}).")
+    parser.add_argument('-j', '--jobs', type=int, help="Int: Number of worker processes (default: number of CPUs).")
+    parser.add_argument('--cache-dir', help="Optional directory for caching encoded scripts, so unchanged inputs convert faster.")
+    parser.add_argument('--cache-size', type=int, default=512, help="Int: Maximum size of the cache in MB (default: 512).")
+    args = parser.parse_args(argv)
+
+    cache = None
+    if args.cache_dir:
+        from .cache import ConversionCache
+        cache = ConversionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    from .server import ConversionService, create_server
+    address = f"unix:{os.path.abspath(args.socket)}" if args.socket else f"{args.host}:{args.port}"
+    service = ConversionService(args.jobs, cache)
+    try:
+        server = create_server(address, service)
+    except OSError as e:
+        service.close()
+        print(f"Error: Could not listen on {address}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Serving on {address} with {service.jobs} workers (Ctrl+C to stop).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if args.socket:
+            os.remove(os.path.abspath(args.socket))
+
+def convert_remote(server, input_path, output_dir, output_name, text_width, substitutions, stats_format):
+    from .server import ConversionClient
+
+    client = ConversionClient(server)
+    try:
+        response = client.convert(input_path, output_dir, output_name, text_width, substitutions=substitutions,
+                                  stats=stats_format is not None)
+    finally:
+        client.close()
+
+    print(f"AVC file created successfully at {response['output_path']}", file=sys.stderr)
+    if stats_format:
+        print_stats([response['stats']], stats_format)
+
+def format_inspection(result):
+    """
+    Format an `InspectionResult` as a single human-readable line.
+    """
+    if not result.ok:
+        return f"{result.path}: INVALID: {' '.join(result.problems)}"
+    summary = result.summary
+    return (f"{result.path}: OK  {summary['lines']} lines, {summary['characters']} characters, "
+            f"uuid {summary['uuid']}, created {summary['timestamp']}")
+
+def inspect_main(argv):
+    parser = argparse.ArgumentParser(prog="pyavc inspect", description="Check .avc files: their length fields, CR counts, NUM CHAR B tables and UUIDs.")
+    parser.add_argument('paths', nargs='+', help=".avc files, directories or glob patterns to check.")
+    parser.add_argument('-j', '--jobs', type=int, help="Int: Number of worker processes (default: number of CPUs).")
+    parser.add_argument('--quick', action='store_true', help="Only check the layout and length fields, not every NUM CHAR B entry against the text.")
+    parser.add_argument('--line', type=int, action='append', metavar='N', help="Int: Print line N of a single file (negative numbers count from the end). Can be repeated.")
+    parser.add_argument('--json', action='store_true', help="Print the results as JSON.")
+    args = parser.parse_args(argv)
+
+    from .reader import AVCReader, inspect_many
+
+    try:
+        paths = []
+        for spec in args.paths:
+            if os.path.isfile(spec):
+                paths.append(ensure_absolute_path(spec))
+            else:
+                paths.extend(expand_batch_inputs(spec, ('.avc',)))
+
+        if args.line:
+            if len(paths) != 1:
+                parser.error("--line needs exactly one file.")
+            with AVCReader(paths[0]) as reader:
+                for index in args.line:
+                    print(reader[index])
+            return
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    results = inspect_many(paths, args.jobs, check_lines=not args.quick)
+    if args.json:
+        print(json.dumps([result._asdict() for result in results], indent=2))
+    else:
+        for result in results:
+            print(format_inspection(result))
+
+    failed = [result for result in results if not result.ok]
+    if not args.json:
+        print(f"Checked {len(results)} files, {len(failed)} invalid.")
+    if failed:
+        sys.exit(1)
+
+def update_main(argv):
+    parser = argparse.ArgumentParser(prog="pyavc update", description="Convert a revised script, re-encoding only the paragraphs that changed since its previous .avc file.")
+    parser.add_argument('previous', help="The .avc file of the previous revision, converted with --index or by pyavc update.")
+    parser.add_argument('-i', '--input', required=True, help="Path to the revised DOCX, TXT or FDX file.")
+    parser.add_argument('-o', '--output', help="Path of the new .avc file (default: replace the previous one).")
+    parser.add_argument('-t', '--text_width', type=int, default=80, help="Int: Optional max chars before line break is inserted")
+    parser.add_argument('--normalize', action='store_true', help="Replace smart quotes, dashes, ellipses, special spaces and zero-width characters with plain text for ScriptSync.")
+    parser.add_argument('--sub', action='append', type=parse_substitution, metavar='FROM=TO', help="Replace FROM with TO before wrapping. Can be repeated, and overrides --normalize for the same FROM.")
+    parser.add_argument('--stats', choices=['json', 'text'], help="Print per-stage timings and counters for the conversion.")
+    args = parser.parse_args(argv)
+
+    from .core import update
+
+    try:
+        previous = ensure_absolute_path(args.previous)
+        if not os.path.isfile(previous):
+            raise FileNotFoundError(f"The previous .avc file '{previous}' does not exist.")
+        input_path = ensure_absolute_path(args.input)
+
+        stats = None
+        if args.stats:
+            from .stats import ConversionStats
+            stats = ConversionStats()
+        update(previous, input_path, args.output and ensure_absolute_path(args.output), args.text_width, stats,
+               build_substitutions(args.normalize, args.sub))
+        if stats is not None:
+            print_stats([stats.as_dict()], args.stats)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+def archive_main(argv):
+    parser = argparse.ArgumentParser(prog="pyavc archive", description="Convert the DOCX/TXT files in a zip or tar archive into .avc files in another archive, without extracting anything.")
+    parser.add_argument('input', help="The zip or tar archive of scripts.")
+    parser.add_argument('output', help="The archive to write the .avc files to (.zip, .tar, .tar.gz, .tar.bz2 or .tar.xz).")
+    parser.add_argument('-t', '--text_width', type=int, default=80, help="Int: Optional max chars before line break is inserted")
+    parser.add_argument('-j', '--jobs', type=int, help="Int: Number of worker processes (default: number of CPUs).")
+    parser.add_argument('--normalize', action='store_true', help="Replace smart quotes, dashes, ellipses, special spaces and zero-width characters with plain text for ScriptSync.")
+    parser.add_argument('--sub', action='append', type=parse_substitution, metavar='FROM=TO', help="Replace FROM with TO before wrapping. Can be repeated, and overrides --normalize for the same FROM.")
+    args = parser.parse_args(argv)
+
+    from .archive import convert_archive
+
+    try:
+        results = convert_archive(ensure_absolute_path(args.input), ensure_absolute_path(args.output), args.text_width,
+                                  args.jobs, build_substitutions(args.normalize, args.sub))
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        print(f"Error: {result.input_path}: {result.error}", file=sys.stderr)
+    print(f"Converted {len(results) - len(failed)} of {len(results)} files into '{args.output}'.")
+    if failed:
+        sys.exit(1)
+
+def convert_stdio(input_spec, output_spec, input_format, output_name, text_width, cache, stats_format, substitutions, jobs):
+    """
+    Convert a single input where '-' stands for stdin (input) or stdout (output).
+
+    Stdin is streamed through the read/wrap/encode stages. With `-o -` the .avc data is the only
+    thing written to stdout: it is written straight to a file, and spooled when stdout is a pipe or appends (`>>`).
+    """
+    if input_spec == '-':
+        source = sys.stdin.buffer
+        # The format is recognised from the first bytes, which are peeked at without consuming them
+        input_format = input_format or detect_format(source)
+        if input_format is None:
+            raise ValueError(f"Can't tell the format of the input on stdin: add -f with one of {', '.join(input_formats())}.")
+    else:
+        source = ensure_absolute_path(input_spec)
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"The input file '{source}' does not exist.")
+
+    if output_spec == '-':
+        if sys.stdout.isatty():
+            raise ValueError("Refusing to write .avc data to a terminal; redirect stdout to a file or a pipe.")
+        output_dir = None
+    else:
+        output_dir = ensure_absolute_path(output_spec)
+        if not os.path.isdir(output_dir):
+            raise NotADirectoryError(f"The output directory '{output_dir}' does not exist or is not a directory.")
+
+    stats = None
+    if stats_format:
+        from .stats import ConversionStats
+        stats = ConversionStats()
+    avc_file = AVCFile(source, output_dir, output_name, text_width, input_format=input_format, cache=cache, stats=stats,
+                       substitutions=substitutions, jobs=jobs)
+    if output_dir is None:
+        avc_file.write(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        avc_file.create()
+    if stats is not None:
+        print_stats([stats.as_dict()], stats_format, sys.stderr if output_dir is None else None)
+
+COMMANDS = {
+    'watch': watch_main,
+    'serve': serve_main,
+    'inspect': inspect_main,
+    'update': update_main,
+    'archive': archive_main,
+}
+
 def main():
+    # Library progress messages (e.g. "AVC file created successfully at ...") are logged; show them as plain
+    # messages on stderr, so stdout only ever carries results (and the .avc data itself with `-o -`)
+    logging.basicConfig(level=logging.INFO, format='%(message)s', stream=sys.stderr)
 
     sys.argv = [replace_smart_quotes(arg) for arg in sys.argv]
     sys.argv = fix_split_arguments(sys.argv)
+
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return COMMANDS[sys.argv[1]](sys.argv[2:])
     
     #print(f"Processed arguments: {sys.argv}")
 
     # Create the parser
-    parser = argparse.ArgumentParser(description="Process a DOCX or TXT file into the desired output format.")
+    parser = argparse.ArgumentParser(description="Process a DOCX, TXT or Final Draft (FDX) file into the desired output format.")
 
     # Add arguments
-    parser.add_argument('-i', '--input', required=True, help="Path to the input DOCX or TXT file.")
-    parser.add_argument('-o', '--output_dir', required=True, help="Path to the output directory.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-i', '--input', help="Path to the input DOCX, TXT or FDX file, or - to read it from stdin.")
+    source.add_argument('-b', '--batch', help="Directory or glob pattern of DOCX/TXT/FDX files to convert in one run.")
+    parser.add_argument('-o', '--output_dir', required=True, help="Path to the output directory, or - to write the .avc data to stdout.")
+    parser.add_argument('-f', '--format', choices=input_formats(), help="The input format, when it can't be taken from the file extension or recognised from the contents (e.g. a TXT file on stdin).")
     parser.add_argument('-n', '--output_name', help="Str: Optional name for the output file (without extension).")
-    parser.add_argument('-t', '--text_width', help="Int: Optional max chars before line break is inserted")
+    parser.add_argument('-t', '--text_width', type=int, default=80, help="Int: Optional max chars before line break is inserted")
+    parser.add_argument('-j', '--jobs', type=int, help="Int: Number of worker processes. With --batch, files are converted in parallel (default: number of CPUs); with -i, a large file is wrapped and encoded in parallel chunks (default: 1).")
+    parser.add_argument('--cache-dir', help="Optional directory for caching encoded scripts, so unchanged inputs convert faster.")
+    parser.add_argument('--cache-size', type=int, default=512, help="Int: Maximum size of the cache in MB (default: 512).")
+    parser.add_argument('--normalize', action='store_true', help="Replace smart quotes, dashes, ellipses, special spaces and zero-width characters with plain text for ScriptSync.")
+    parser.add_argument('--sub', action='append', type=parse_substitution, metavar='FROM=TO', help="Replace FROM with TO before wrapping. Can be repeated, and overrides --normalize for the same FROM.")
+    parser.add_argument('--stats', choices=['json', 'text'], help="Print per-stage timings and counters for each conversion.")
+    parser.add_argument('--index', action='store_true', help="Save a paragraph index next to the .avc file, so `pyavc update` can re-encode only what changes in later revisions.")
+    parser.add_argument('--server', help="Convert through a running `pyavc serve` at this address (unix:PATH or HOST:PORT).")
     # Parse the arguments
     args = parser.parse_args()
 
+    if args.batch and args.output_name:
+        parser.error("-n/--output_name cannot be used with --batch.")
+    if args.index and args.batch:
+        parser.error("--index is only supported with -i.")
+    if args.server and (args.batch or args.jobs or args.cache_dir or args.index):
+        parser.error("--server converts a single -i input; workers and caching are configured on the server.")
+    if args.output_dir == '-' and (args.batch or args.index or args.server):
+        parser.error("-o - writes a single .avc file to stdout; it can't be used with --batch, --index or --server.")
+    if args.server and args.input == '-':
+        parser.error("--server reads the input file itself; -i - can't be used with it.")
+
     try:
-        input_path, output_dir = validate_paths(args.input, args.output_dir)
+        cache = None
+        if args.cache_dir:
+            from .cache import ConversionCache
+            cache = ConversionCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+        substitutions = build_substitutions(args.normalize, args.sub)
+
+        if args.batch:
+            if not run_batch(args.batch, args.output_dir, args.text_width, args.jobs, cache, args.stats, substitutions):
+                sys.exit(1)
+            return
+
+        if args.input == '-' or args.output_dir == '-':
+            return convert_stdio(args.input, args.output_dir, args.format, args.output_name, args.text_width, cache,
+                                 args.stats, substitutions, args.jobs)
+
+        input_path, output_dir = validate_paths(args.input, args.output_dir, args.format)
         
         output_name = args.output_name if args.output_name else None
-        text_width = args.text_width if args.text_width else 80
-        avc_file = AVCFile(input_path, output_dir, output_name, text_width)
+        text_width = args.text_width
+
+        if args.server:
+            return convert_remote(args.server, input_path, output_dir, output_name, text_width, substitutions, args.stats)
+
+        stats = None
+        if args.stats:
+            from .stats import ConversionStats
+            stats = ConversionStats()
+        avc_file = AVCFile(input_path, output_dir, output_name, text_width, input_format=args.format, cache=cache,
+                           stats=stats, substitutions=substitutions, jobs=args.jobs, index=args.index)
         output_path = avc_file.create()
+        if stats is not None:
+            print_stats([stats.as_dict()], args.stats)
         
         #print(f"Successfully processed '{input_path}' to '{output_path}'.")
 
+    except BrokenPipeError:
+        # The reader of stdout went away (e.g. `pyavc ... -o - | head`); stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
     except FileNotFoundError as fnf_error:
-        print(f"Error: {fnf_error}")
+        print(f"Error: {fnf_error}", file=sys.stderr)
         sys.exit(1)
     except ValueError as ve:
-        print(f"Error: {ve}")
+        print(f"Error: {ve}", file=sys.stderr)
         sys.exit(1)
     except NotADirectoryError as nde:
-        print(f"Error: {nde}")
+        print(f"Error: {nde}", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
-        print(f"Unexpected error: {e}")
+        print(f"Unexpected error: {e}", file=sys.stderr)
         sys.exit(1)
 
 if __name__ == '__main__':
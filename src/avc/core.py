@@ -1,21 +1,222 @@
 from .file import AVCFile
+from .formats import detect_format, supported_extensions
+from .utils import normalize_input_format
+from .stats import ConversionStats
+from collections import namedtuple
+import io
+import logging
 import os
+import tempfile
 
-def convert(filepath, output_dir, output_name=None, text_width=80):
+logger = logging.getLogger(__name__)
+
+
+class ConversionResult(namedtuple('ConversionResult', ['input_path', 'output_path', 'error', 'stats'])):
+    """
+    The outcome of converting a single file in a batch.
+
+    Attributes:
+        input_path (str): The input file that was converted.
+        output_path (str or None): The path of the created .avc file, or None if the conversion failed.
+        error (str or None): A description of the error, or None if the conversion succeeded.
+        stats (dict or None): The conversion's `ConversionStats.as_dict()`, when stats were requested.
+    """
+    __slots__ = ()
+
+    def __new__(cls, input_path, output_path, error, stats=None):
+        return super().__new__(cls, input_path, output_path, error, stats)
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def _validate_input(filepath):
     if not os.path.exists(filepath):
-            raise FileNotFoundError(f"The input file '{filepath}' does not exist.")
-        
-    if not (filepath.lower().endswith('.txt') or filepath.lower().endswith('.docx')):
-        raise ValueError(f"The input file '{filepath}' must be a .txt or .docx file.")
-        
-        # Check if the output directory exists
-    if not os.path.exists(output_dir):
+        raise FileNotFoundError(f"The input file '{filepath}' does not exist.")
+
+    if detect_format(filepath) is None:
+        raise ValueError(f"The input file '{filepath}' must be one of {', '.join(supported_extensions())}.")
+
+
+def _validate_output_dir(output_dir):
+    if not os.path.isdir(output_dir):
         raise NotADirectoryError(f"The output directory '{output_dir}' does not exist or is not a directory.")
-        
-    avc = AVCFile(filepath, output_dir, output_name, text_width)
+
+
+def convert(filepath, output_dir, output_name=None, text_width=80, cache=None, stats=None, substitutions=None, jobs=None,
+            index=False):
+    _validate_input(filepath)
+    _validate_output_dir(output_dir)
+
+    avc = AVCFile(filepath, output_dir, output_name, text_width, cache=cache, stats=stats, substitutions=substitutions,
+                  jobs=jobs, index=index)
     try:
         returned_filepath = avc.create()
         return returned_filepath
 
     except Exception as e:
-        print(f"There was an error: {e}")
+        logger.error("There was an error: %s", e)
+
+
+def update(previous_path, filepath, output_path=None, text_width=80, stats=None, substitutions=None):
+    """
+    Convert a revised script, copying every paragraph that hasn't changed from the .avc file of
+    the previous revision instead of wrapping and encoding it again.
+
+    The previous file needs the paragraph index that `convert(..., index=True)` and `update`
+    save next to it. Without one (or if it was converted with another text width or other
+    substitutions) the script is converted in full, and the index is saved for next time.
+
+    Args:
+        previous_path (str): The .avc file of the previous revision.
+        filepath (str): The revised DOCX or TXT file.
+        output_path (str): Where to write the new .avc file. Defaults to replacing `previous_path`.
+        text_width (int): The maximum line width used when wrapping text.
+        stats (ConversionStats): Optional stats object filled in by the conversion.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        str: The path of the new .avc file.
+    """
+    _validate_input(filepath)
+    output_path = os.path.abspath(output_path or previous_path)
+
+    avc = AVCFile(filepath, text_width=text_width, stats=stats, substitutions=substitutions, previous=previous_path)
+    avc.full_path = output_path
+    # Write next to the target and swap it in, so the previous file stays readable until the end
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path), prefix='.tmp-', suffix='.avc')
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            avc.write(fp)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    avc.save_index(output_path)
+
+    index = avc.paragraph_index
+    logger.info("Reused %d of %d paragraphs; AVC file updated at %s", index.reused, len(index), output_path)
+    return output_path
+
+
+def convert_to_stream(source, output, input_format, text_width=80, cache=None, stats=None, substitutions=None):
+    """
+    Convert an in-memory script and write the .avc data to a binary file object, without touching the disk.
+
+    Args:
+        source (str, bytes or file object): The script as text (TXT only), encoded bytes, or a binary stream.
+        output (file object): A writable binary file object, e.g. a BytesIO or a response body.
+        input_format (str): A registered input format: 'txt', 'docx', 'fdx' (see `avc.formats`).
+        text_width (int): The maximum line width used when wrapping text.
+        cache (ConversionCache): Optional cache of encoded bodies to read from and fill.
+        stats (ConversionStats): Optional stats object filled in by the conversion.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        int: The number of bytes written to `output`.
+    """
+    input_format = normalize_input_format(input_format)
+
+    if isinstance(source, str):
+        if input_format != 'txt':
+            raise ValueError(f"Text input can only be converted as 'txt', not '{input_format}'; pass the file's bytes instead.")
+        source = io.StringIO(source, newline=None)
+
+    return AVCFile(source, text_width=text_width, input_format=input_format, cache=cache, stats=stats,
+                   substitutions=substitutions).write(output)
+
+
+def convert_to_bytes(source, input_format, text_width=80, cache=None, stats=None, substitutions=None):
+    """
+    Convert an in-memory script and return the .avc data.
+
+    Args:
+        source (str, bytes or file object): The script as text (TXT only), encoded bytes, or a binary stream.
+        input_format (str): A registered input format: 'txt', 'docx', 'fdx' (see `avc.formats`).
+        text_width (int): The maximum line width used when wrapping text.
+        cache (ConversionCache): Optional cache of encoded bodies to read from and fill.
+        stats (ConversionStats): Optional stats object filled in by the conversion.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        bytes: The contents of the .avc file.
+    """
+    output = io.BytesIO()
+    convert_to_stream(source, output, input_format, text_width, cache, stats, substitutions)
+    return output.getvalue()
+
+
+def convert_file(filepath, output_dir, output_name=None, text_width=80, cache=None, collect_stats=False,
+                 substitutions=None):
+    """
+    Convert a single file, reporting the outcome as a `ConversionResult` instead of raising.
+
+    It is importable at module level and only ever returns picklable values, so it can run in
+    worker processes; `convert_many` and `avc.aio.convert_many_async` are built on it.
+
+    Args:
+        filepath (str): The input file.
+        output_dir (str): The directory the .avc file is written to.
+        output_name (str): Optional output name (without extension).
+        text_width (int): The maximum line width used when wrapping text.
+        cache (ConversionCache): Optional cache of encoded bodies to read from and fill.
+        collect_stats (bool): Attach the conversion's stats to the result.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        ConversionResult: The outcome.
+    """
+    try:
+        _validate_input(filepath)
+        stats = ConversionStats() if collect_stats else None
+        output_path = AVCFile(filepath, output_dir, output_name, text_width, cache=cache, stats=stats,
+                              substitutions=substitutions).create()
+        return ConversionResult(filepath, output_path, None, stats.as_dict() if stats else None)
+    except Exception as e:
+        return ConversionResult(filepath, None, f"{type(e).__name__}: {e}")
+
+
+def _convert_one(job):
+    # executor.map hands each worker a single argument
+    filepath, output_dir, text_width, cache, collect_stats, substitutions = job
+    return convert_file(filepath, output_dir, None, text_width, cache, collect_stats, substitutions)
+
+
+def convert_many(paths, output_dir, text_width=80, jobs=None, cache=None, collect_stats=False, substitutions=None):
+    """
+    Convert several DOCX or TXT files into the same output directory, spreading the work across processes.
+
+    Errors are collected per file instead of being raised, so one bad input does not abort the batch.
+
+    Args:
+        paths (iterable of str): The input files to convert.
+        output_dir (str): The directory the .avc files are written to.
+        text_width (int): The maximum line width used when wrapping text.
+        jobs (int): The number of worker processes. Defaults to the number of CPUs; 1 converts in-process.
+        cache (ConversionCache): Optional cache of encoded bodies, shared by all workers.
+        collect_stats (bool): Attach each file's stats to its result.
+        substitutions (dict or Substitutions): Optional text substitutions applied before wrapping.
+
+    Returns:
+        list of ConversionResult: One result per input, in the same order as `paths`.
+    """
+    _validate_output_dir(output_dir)
+
+    work = [(filepath, output_dir, text_width, cache, collect_stats, substitutions) for filepath in paths]
+    if not work:
+        return []
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(work)))
+
+    if jobs == 1:
+        return [_convert_one(job) for job in work]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Hand out several files per round-trip so IPC overhead stays small next to the conversion itself
+    chunksize = max(1, len(work) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_convert_one, work, chunksize=chunksize))
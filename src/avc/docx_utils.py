@@ -1,40 +1,233 @@
-from docx import Document
+import io
+import posixpath
+import zipfile
+import zlib
+from xml.etree import ElementTree
+from .utils import wrap_line
+from .substitutions import compile_substitutions
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+RELS_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+OFFICE_DOCUMENT_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+
+W_DOCUMENT = W_NS + 'document'
+W_P = W_NS + 'p'
+W_R = W_NS + 'r'
+W_HYPERLINK = W_NS + 'hyperlink'
+W_BR = W_NS + 'br'
+W_TYPE = W_NS + 'type'
+
+# Text equivalents of run content, matching python-docx's Run.text
+RUN_TEXT = {
+    W_NS + 'tab': '\t',
+    W_NS + 'ptab': '\t',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+
+# Characters str.splitlines() treats as line boundaries
+LINE_BOUNDARIES = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
 
 def wrap_text(text, width=80):
     wrapped_lines = []
     for line in text.splitlines():
-        current_line = ""
-        for word in line.split():
-            if len(current_line) + len(word) + 1 <= width:
-                if current_line:
-                    current_line += " "
-                current_line += word
-            else:
-                wrapped_lines.append(current_line)
-                current_line = word
-        wrapped_lines.append(current_line)
+        wrapped_lines.extend(wrap_line(line, width))
     return wrapped_lines
 
-def convert_docx_to_lines(docx_path, width=80, substitutions=None):
-    # Load the DOCX file
-    doc = Document(docx_path)
-    full_text = []
-
-    # Extract the text from the DOCX
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    
-    # Combine the paragraphs into a single text block
-    content = '\n'.join(full_text)
-
-    # Perform character substitutions if any
-    if substitutions:
-        for key, value in substitutions.items():
-            content = content.replace(key, value)
-    
-    # Wrap the text to the specified width
-    wrapped_lines = wrap_text(content, width)
 
-    return wrapped_lines
+def _main_document_part(archive):
+    # The main part is normally word/document.xml, but the package relationships are authoritative
+    try:
+        rels = ElementTree.fromstring(archive.read('_rels/.rels'))
+    except (KeyError, ElementTree.ParseError):
+        rels = None
+
+    if rels is not None:
+        for rel in rels.iter(RELS_NS + 'Relationship'):
+            if rel.get('Type') == OFFICE_DOCUMENT_REL and rel.get('TargetMode') != 'External':
+                part = posixpath.normpath(rel.get('Target', '').lstrip('/'))
+                if part in archive.NameToInfo:
+                    return part
+
+    return 'word/document.xml' if 'word/document.xml' in archive.NameToInfo else None
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == W_NS + 't':
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            # Only line breaks count as text; page and column breaks are dropped
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        elif tag in RUN_TEXT:
+            parts.append(RUN_TEXT[tag])
+    return ''.join(parts)
+
+def _paragraph_text(paragraph):
+    # Same content as python-docx's Paragraph.text: direct runs plus runs inside hyperlinks
+    parts = []
+    for child in paragraph:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            parts.extend(_run_text(run) for run in child.findall(W_R))
+    return ''.join(parts)
+
+def _iter_xml_paragraphs(events):
+    # `events` is an iterparse iterator positioned just after the root's start event
+    depth = 1
+    body = None
+    for event, elem in events:
+        if event == 'start':
+            depth += 1
+            if depth == 2:
+                body = elem
+            continue
+
+        depth -= 1
+        # Only top-level body paragraphs are text, as with python-docx's Document.paragraphs
+        if depth == 2:
+            if elem.tag == W_P:
+                yield _paragraph_text(elem)
+            # Drop finished body children so memory stays flat across the document
+            body.remove(elem)
+
+def _seekable_source(docx_path):
+    # Zip archives are read from the end, so in-memory and unseekable sources become BytesIO
+    if isinstance(docx_path, (bytes, bytearray, memoryview)):
+        return io.BytesIO(docx_path)
+    if hasattr(docx_path, 'read') and not (hasattr(docx_path, 'seekable') and docx_path.seekable()):
+        return io.BytesIO(docx_path.read())
+    return docx_path
+
+def is_docx(docx_path):
+    """
+    Tell whether a zip file holds a Word document, i.e. has a main document part.
+
+    Args:
+        docx_path (str, bytes or file object): A file path, the file's bytes or a seekable binary stream.
+
+    Returns:
+        bool: True for a DOCX package.
+    """
+    try:
+        with zipfile.ZipFile(_seekable_source(docx_path)) as archive:
+            return _main_document_part(archive) is not None
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+def _iter_python_docx_paragraphs(docx_path):
+    from docx import Document
+    from docx.opc.exceptions import PackageNotFoundError
+
+    try:
+        document = Document(docx_path)
+    except (PackageNotFoundError, zipfile.BadZipFile, KeyError) as e:
+        # Report unreadable packages as bad input, like the other readers
+        raise ValueError(f"The input is not a readable DOCX document: {e}")
+    for para in document.paragraphs:
+        yield para.text
+
+def iter_docx_paragraphs(docx_path):
+    """
+    Yield the text of each body paragraph of a DOCX file, one at a time.
 
+    word/document.xml is parsed incrementally straight out of the zip; python-docx is used
+    as a fallback for packages this reader doesn't recognise.
 
+    Args:
+        docx_path (str, bytes or file object): A file path, the DOCX bytes or a binary stream.
+
+    Returns:
+        generator of str: The paragraph texts, in document order.
+
+    Raises:
+        ValueError: If the input is not a readable DOCX document.
+    """
+    docx_path = _seekable_source(docx_path)
+    try:
+        archive = zipfile.ZipFile(docx_path)
+    except zipfile.BadZipFile:
+        archive = None
+
+    part = _main_document_part(archive) if archive is not None else None
+    if part is None:
+        if archive is not None:
+            archive.close()
+        yield from _iter_python_docx_paragraphs(docx_path)
+        return
+
+    with archive, archive.open(part) as xml_file:
+        events = ElementTree.iterparse(xml_file, events=('start', 'end'))
+
+        # Check the root before yielding anything, so falling back never repeats paragraphs
+        try:
+            _, root = next(events)
+        except (StopIteration, ElementTree.ParseError):
+            root = None
+
+        if root is None or root.tag != W_DOCUMENT:
+            yield from _iter_python_docx_paragraphs(docx_path)
+            return
+
+        try:
+            yield from _iter_xml_paragraphs(events)
+        except (ElementTree.ParseError, zipfile.BadZipFile, zlib.error) as e:
+            raise ValueError(f"The DOCX document is damaged: {e}")
+
+def iter_paragraph_lines(paragraphs, width=80, substitutions=None, last=True):
+    """
+    Wrap a stream of DOCX paragraphs into text lines.
+
+    Produces the same lines as joining every paragraph with newlines and wrapping the result.
+
+    Args:
+        paragraphs (iterable of str): The paragraph texts, as from `iter_docx_paragraphs`.
+        width (int): The maximum line width.
+        substitutions (dict or Substitutions): Optional substitutions applied to each paragraph.
+        last (bool): Whether `paragraphs` ends the document. Pass False for a piece of a larger
+            document, so a trailing line boundary still produces its empty line.
+
+    Returns:
+        generator of str: The wrapped lines.
+    """
+    substitute = compile_substitutions(substitutions)
+
+    # A line boundary at the very end of the document doesn't start a new line (str.splitlines
+    # semantics), so each segment is held back until we know another one follows it.
+    pending = None
+    for paragraph in paragraphs:
+        if substitute is not None:
+            paragraph = substitute(paragraph)
+
+        segments = paragraph.splitlines()
+        if not paragraph or paragraph[-1] in LINE_BOUNDARIES:
+            segments.append('')
+
+        for segment in segments:
+            if pending is not None:
+                yield from wrap_line(pending, width)
+            pending = segment
+
+    if pending or (pending is not None and not last):
+        yield from wrap_line(pending, width)
+
+def iter_docx_lines(docx_path, width=80, substitutions=None):
+    """
+    Yield the wrapped text lines of a DOCX file, streaming one paragraph at a time.
+
+    Args:
+        docx_path (str, bytes or file object): The DOCX source, as for `iter_docx_paragraphs`.
+        width (int): The maximum line width.
+        substitutions (dict or Substitutions): Optional substitutions applied to each paragraph.
+
+    Returns:
+        generator of str: The wrapped lines.
+    """
+    return iter_paragraph_lines(iter_docx_paragraphs(docx_path), width, substitutions)
+
+def convert_docx_to_lines(docx_path, width=80, substitutions=None):
+    return list(iter_docx_lines(docx_path, width, substitutions))
@@ -0,0 +1,87 @@
+import io
+from xml.etree import ElementTree
+
+FDX_ROOT = 'FinalDraft'
+FDX_CONTENT = 'Content'
+FDX_PARAGRAPH = 'Paragraph'
+FDX_TEXT = 'Text'
+FDX_DUAL_DIALOGUE = 'DualDialogue'
+
+
+def _is_script_paragraph(path, content):
+    # `path` ends with the paragraph itself. Script paragraphs sit directly in the body, or in a
+    # DualDialogue of a body paragraph; the paragraphs of scene properties (arc beats, summaries)
+    # and other containers are metadata
+    if content is None:
+        return False
+    return len(path) == 3 or (len(path) == 5 and path[2] == FDX_PARAGRAPH and path[3] == FDX_DUAL_DIALOGUE)
+
+
+def _iter_content_paragraphs(events):
+    # `events` is an iterparse iterator positioned just after the root's start event. Only the
+    # script body (FinalDraft/Content) is text: the title page, notes and header/footer aren't.
+    path = [FDX_ROOT]
+    content = None
+    # One entry per open script paragraph: [its depth, its Text runs, whether it holds dual dialogue]
+    open_paragraphs = []
+    for event, elem in events:
+        if event == 'start':
+            path.append(elem.tag)
+            if len(path) == 2 and elem.tag == FDX_CONTENT:
+                content = elem
+            elif elem.tag == FDX_PARAGRAPH and _is_script_paragraph(path, content):
+                if open_paragraphs:
+                    open_paragraphs[-1][2] = True
+                open_paragraphs.append([len(path), [], False])
+            continue
+
+        path.pop()
+        if content is None:
+            continue
+        # Only Text runs that are direct children of an open script paragraph count
+        if elem.tag == FDX_TEXT and open_paragraphs and open_paragraphs[-1][0] == len(path):
+            open_paragraphs[-1][1].append(''.join(elem.itertext()))
+        elif elem.tag == FDX_PARAGRAPH and open_paragraphs and open_paragraphs[-1][0] == len(path) + 1:
+            _, parts, nested = open_paragraphs.pop()
+            # Dual dialogue wraps its speeches in an outer paragraph with no text of its own
+            if parts or not nested:
+                yield ''.join(parts)
+
+        if len(path) == 2:
+            # Drop finished body children so memory stays flat across the script
+            content.remove(elem)
+        elif elem is content:
+            content = None
+
+
+def iter_fdx_paragraphs(fdx_path):
+    """
+    Yield the text of each script paragraph of a Final Draft (.fdx) file, one at a time.
+
+    The XML is parsed incrementally, so it can come straight from a pipe. A paragraph's text is
+    its Text runs joined together; the paragraphs of dual dialogue come out one after the other.
+
+    Args:
+        fdx_path (str, bytes or file object): A file path, the FDX bytes or a binary stream.
+
+    Returns:
+        generator of str: The paragraph texts, in script order.
+
+    Raises:
+        ValueError: If the input is not a well-formed Final Draft document.
+    """
+    if isinstance(fdx_path, (bytes, bytearray, memoryview)):
+        fdx_path = io.BytesIO(fdx_path)
+
+    events = ElementTree.iterparse(fdx_path, events=('start', 'end'))
+    try:
+        _, root = next(events)
+    except (StopIteration, ElementTree.ParseError):
+        root = None
+    if root is None or root.tag != FDX_ROOT:
+        raise ValueError("The input is not a Final Draft (.fdx) document.")
+
+    try:
+        yield from _iter_content_paragraphs(events)
+    except ElementTree.ParseError as e:
+        raise ValueError(f"The Final Draft (.fdx) document is malformed: {e}")
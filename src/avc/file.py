@@ -1,276 +1,585 @@
-import os
-from .utils import reverse_str, encode_u32le, encode_u64le, encode_u32be, encode_str, conform_byte_string, generate_truncated_uuidv7, extra_padding, count_carriage_returns, swap_lf_cr, calculate_and_insert_counts, wrap_txt_file_line
-from datetime import datetime
-from .bytestrings import footer1, footer2, placeholder, byte_order_indicator, identifier1, identifier2, identifier3, creator_description_len_marker, bs1, bs2, bs3, bs4
-from .docx_utils import convert_docx_to_lines
-
-class AVCHeader:
-    def __init__(self, uuid):
-        self.byte_order_indicator = byte_order_indicator
-        self.magic = 'Domain'
-        self.fourcc1 = 'OBJD'
-        self.identifier1 = identifier1
-        self.objdoc = 'AObjDoc'
-        self.identifier2 = identifier2
-        self.timestamp_str = datetime.now().strftime(u'%Y/%m/%d %H:%M:%S')
-        self.identifier3 = identifier3
-        self.iiii = b'IIII'
-        self.uuid = uuid
-        self.fourcc2 = u'ATsc'
-        self.fourcc3 = u'ATve' 
-        self.creator_description_len_marker = creator_description_len_marker
-        self.creator_description = "pyavc v1.0.11"
-    
-    def create(self):
-        data = bytearray()
-        
-        # Byte order indicator
-        data += self.byte_order_indicator
-        # Magic word
-        data += encode_str(self.magic)
-        # fourcc1
-        data += reverse_str(self.fourcc1)
-        # identifier1
-        data += conform_byte_string(self.identifier1)
-        # AObjDoc
-        data += encode_str(self.objdoc) 
-        # identifier2
-        data += conform_byte_string(self.identifier2)
-        # Timestamp str
-        data += encode_str(self.timestamp_str)
-        # identifier3
-        data += conform_byte_string(self.identifier3)
-        # iiii
-        data += self.iiii    
-        # uuid
-        data += encode_u64le(self.uuid)
-        # fourcc2
-        data += reverse_str(self.fourcc2)
-        # fourcc3
-        data += reverse_str(self.fourcc3)
-        # creator_description_length
-        data += conform_byte_string(self.creator_description_len_marker)
-        # Creator description + pad until 30 bytes
-        encoded_desc = encode_str(self.creator_description)
-
-        if len(encoded_desc) > 30:
-            data += encoded_desc[:30]  # Truncate to 30 bytes
-        else:
-            to_pad = 30 - len(encoded_desc)
-            data += encoded_desc
-            data += b'\x20' * to_pad  # Pad with spaces until 30 bytes
-        
-        # Add extra padding
-        data += extra_padding(16)
-        
-        return data
-        
-        
-        
-        
-
-class BTXTChunk:
-    def __init__(self, uuid, txt_lines):
-        self.txt_lines = txt_lines
-        self.class_id = u'BTXT'
-
-        self.num_char = 0
-        self.num_lines = 0
-        self.num_newlines = 0
-        self.uuid = uuid
-        self.footer1 = footer1
-        self.footer2 = footer2
-
-
-        
-    def create(self):
-        data = bytearray()
-        formatted_lines = []
-        
-        # Reverse and add the class id
-        data += reverse_str(self.class_id)
-        
-        # NUM CHAR A Index
-        num_char_a_idx = len(data)  
-
-        # NUM CHAR A Placeholder
-        data += placeholder  
-        
-        # Start count of NUM CHAR A
-        num_char_a_start = len(data)
-        
-        # Add bs1
-        data += bs1
-        
-        # NUM CHAR D Index
-        num_char_d_idx = len(data)  
-
-        # NUM CHAR D Placeholder
-        data += placeholder
-        
-        # Start count of NUM CHAR D
-        num_char_d_start = len(data)
-        
-        
-        # Count the number of characters and insert text content
-        for line in self.txt_lines:
-            stripped_line = line.rstrip('\n').rstrip('\r')
-            swapped = swap_lf_cr(stripped_line)
-            swapped += '\r'
-            formatted_lines.append(swapped)
-            encoded_line = encode_str(swapped)
-            data += encoded_line
-        
-        
-        # Stop count of NUM CHAR D
-        num_char_d_end = len(data)
-        data[num_char_d_idx:num_char_d_idx+4] = encode_u32le(len(data) - num_char_d_start)
-        
-        # Insert num newline chars in text content
-        self.num_newlines = count_carriage_returns(formatted_lines)
-        encoded_num_newlines = encode_u32be(self.num_newlines)
-
-        data += conform_byte_string(encoded_num_newlines, 4)
-        
-        # Start count of NUM CHAR B (Recursive)
-        running_total = 0
-        for line in self.txt_lines:
-            line_num_char = len(line)
-            running_total += line_num_char
-            encoded = encode_u32be(running_total)
-            data += conform_byte_string(encoded)
-        
-        
-        # Add bs2
-        data += conform_byte_string(bs2)
-        
-        # Stop count of NUM CHAR A 
-        num_char_a_end = len(data)
-        data[num_char_a_idx:num_char_a_idx+4] = encode_u32le(len(data) - num_char_a_start)
-
-        # Add 'Scpt' string
-        data += reverse_str('Scpt')
-        
-        # NUM CHAR C Index
-        num_char_c_idx = len(data)
-
-        # NUM CHAR C Placeholder
-        data += placeholder
-        
-        # Start count of NUM CHAR C
-        num_char_c_start = len(data)
-        
-        # Add bs3
-        data += conform_byte_string(bs3)
-        
-        # Add footer1
-        data += conform_byte_string(footer1)
-        
-        # Add bs4 and 5 padding characters
-        data += conform_byte_string(bs4, 5)
-        
-        # Add UUID
-        data += conform_byte_string(self.uuid, 8)
-        # Add footer2
-        data += conform_byte_string(footer2)
-        
-        # End count of NUM CHAR C
-        num_char_c_end = len(data)
-        
-        
-        # Calculate and insert counts using the helper function
-        calculate_and_insert_counts(data, num_char_a_start, num_char_a_end, num_char_a_idx)
-        calculate_and_insert_counts(data, num_char_d_start, num_char_d_end, num_char_d_idx)
-        calculate_and_insert_counts(data, num_char_c_start, num_char_c_end, num_char_c_idx)
-        
-        return data
-
-    
-
-
-
-
-class AVCFile:
-    def __init__(self, input_path, output_dir, output_file_name=None, text_width=80):
-        self.name = output_file_name
-        self.output_dir = output_dir
-        self.full_path = None
-        self.input_file = input_path
-        self.txt_lines = None
-        self.text_width = text_width
-        self.uuid = generate_truncated_uuidv7()
-        self.header = None
-        self.btxt_chunk = None
-
-        
-    def create(self):
-        if self.input_file.lower().endswith('.txt'):
-            # Read txt file - must be UTF-8
-            with open(self.input_file, 'r', encoding='utf-8-sig') as txt:
-                self.txt_lines = txt.readlines()
-                new_txt_lines = []
-                for line in self.txt_lines:
-                    wrapped_txt = wrap_txt_file_line(line, self.text_width)
-                    new_txt_lines.extend(wrapped_txt)  # Use extend to add all wrapped lines
-                self.txt_lines = new_txt_lines
-                
-        
-        elif self.input_file.lower().endswith('.docx'):
-            self.txt_lines = convert_docx_to_lines(self.input_file, self.text_width)
-    
-        # Step 2: Determine the base name and enforce the 56-character limit
-        if self.name is None:
-            # Split the base name and the extension
-            base_name, ext = os.path.splitext(os.path.basename(self.input_file))
-        else:
-            base_name = self.name
-    
-        # Trim any trailing whitespace from the base name
-        base_name = base_name.rstrip()
-    
-        # Ensure the base name doesn't exceed 56 characters
-        base_name = base_name[:56] if len(base_name) > 56 else base_name
-    
-        # Step 3: Construct the initial full path
-        full_path = os.path.join(self.output_dir, f"{base_name}.avc")
-    
-        # Step 4: Check if the file exists and append an incrementing number if necessary
-        if os.path.exists(full_path):
-            count = 1
-            while True:
-                suffix = f"({count})"
-                # Calculate the maximum allowed length for the base name after appending the suffix
-                max_base_length = 56 - len(suffix)
-                # Truncate the base name if necessary
-                truncated_base = base_name[:max_base_length] if len(base_name) > max_base_length else base_name
-                # Construct the new file name with the suffix
-                new_file_name = f"{truncated_base}{suffix}.avc"
-                new_full_path = os.path.join(self.output_dir, new_file_name)
-                # Check if this new path exists
-                if not os.path.exists(new_full_path):
-                    full_path = new_full_path
-                    break  # Exit the loop once a unique name is found
-                count += 1  # Increment the counter and try again
-    
-        # Step 5: Assign the final path to the instance variable
-        self.full_path = full_path
-
-        
-        # Generate header
-        self.header = AVCHeader(self.uuid)
-        header_data = self.header.create()
-        # Generate BTXT chunk
-        self.btxt_chunk = BTXTChunk(self.uuid, self.txt_lines)
-        btxt_data = self.btxt_chunk.create()
-        
-        output = header_data + btxt_data
-        
-        # Write data to file
-        with open(self.full_path, 'wb') as avc:
-            avc.write(output)
-        
-        print(f"AVC file created successfully at {self.full_path}")
-        return self.full_path
-        
- 
-
+import io
+import logging
+import os
+import shutil
+import tempfile
+from array import array
+from .utils import reverse_str, encode_u32le, encode_u64le, encode_str, conform_byte_string, generate_truncated_uuidv7, extra_padding, patch_count, pack_u32le_array, normalize_input_format
+from .formats import detect_format, get_format, input_formats
+from .linestore import LineStore, encode_line_batches
+from .naming import claim_output_path
+from .stats import ConversionStats, hooks_registered, run_hooks
+from .substitutions import compile_substitutions
+from datetime import datetime
+from .bytestrings import footer1, footer2, placeholder, byte_order_indicator, identifier1, identifier2, identifier3, creator_description_len_marker, bs1, bs2, bs3, bs4
+
+logger = logging.getLogger(__name__)
+
+# Outputs that can't seek are buffered in memory up to this size before spilling to disk
+SPOOL_MAX_SIZE = 64 * 1024 * 1024
+
+TIMESTAMP_FORMAT = u'%Y/%m/%d %H:%M:%S'
+TIMESTAMP_LEN = 19
+UUID_LEN = 8
+
+def _is_seekable(fp):
+    try:
+        if not fp.seekable():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    # Under O_APPEND (e.g. `>> out.avc`) every write lands at the end, wherever we seek to, so the
+    # length fields can't be patched in place
+    return not _is_appending(fp)
+
+def _is_appending(fp):
+    try:
+        import fcntl
+        fd = fp.fileno()
+    except (ImportError, AttributeError, OSError, ValueError):
+        mode = getattr(fp, 'mode', '')
+        return isinstance(mode, str) and 'a' in mode
+    return bool(fcntl.fcntl(fd, fcntl.F_GETFL) & os.O_APPEND)
+
+class AVCHeader:
+    # (template bytes, timestamp offset, uuid offset), compiled once per process on first use
+    _template = None
+
+    def __init__(self, uuid):
+        self.byte_order_indicator = byte_order_indicator
+        self.magic = 'Domain'
+        self.fourcc1 = 'OBJD'
+        self.identifier1 = identifier1
+        self.objdoc = 'AObjDoc'
+        self.identifier2 = identifier2
+        self.timestamp_str = datetime.now().strftime(TIMESTAMP_FORMAT)
+        self.identifier3 = identifier3
+        self.iiii = b'IIII'
+        self.uuid = uuid
+        self.fourcc2 = u'ATsc'
+        self.fourcc3 = u'ATve' 
+        self.creator_description_len_marker = creator_description_len_marker
+        self.creator_description = "pyavc v1.0.11"
+    
+    def create(self):
+        """
+        Return the header bytes.
+
+        Everything but the timestamp and UUID is constant, so the header is copied from a
+        precompiled template and only those two fields are written in by offset.
+
+        Returns:
+            bytearray: The encoded header.
+        """
+        template, timestamp_offset, uuid_offset = self.compile_template()
+        timestamp = encode_str(self.timestamp_str)
+        if len(timestamp) != TIMESTAMP_LEN:
+            return self.build()[0]
+
+        data = bytearray(template)
+        data[timestamp_offset:timestamp_offset + TIMESTAMP_LEN] = timestamp
+        data[uuid_offset:uuid_offset + UUID_LEN] = encode_u64le(self.uuid)
+        return data
+
+    @classmethod
+    def compile_template(cls):
+        """
+        Build (once) and return the header template with blank timestamp and UUID fields.
+
+        Returns:
+            tuple: (template bytes, timestamp offset, uuid offset).
+        """
+        if cls._template is None:
+            prototype = cls(bytes(UUID_LEN))
+            prototype.timestamp_str = ' ' * TIMESTAMP_LEN
+            data, timestamp_offset, uuid_offset = prototype.build()
+            cls._template = (bytes(data), timestamp_offset, uuid_offset)
+        return cls._template
+
+    def build(self):
+        """
+        Encode the header field by field.
+
+        Returns:
+            tuple: (header bytearray, timestamp offset, uuid offset).
+        """
+        data = bytearray()
+        
+        # Byte order indicator
+        data += self.byte_order_indicator
+        # Magic word
+        data += encode_str(self.magic)
+        # fourcc1
+        data += reverse_str(self.fourcc1)
+        # identifier1
+        data += conform_byte_string(self.identifier1)
+        # AObjDoc
+        data += encode_str(self.objdoc) 
+        # identifier2
+        data += conform_byte_string(self.identifier2)
+        # Timestamp str
+        timestamp_offset = len(data)
+        data += encode_str(self.timestamp_str)
+        # identifier3
+        data += conform_byte_string(self.identifier3)
+        # iiii
+        data += self.iiii    
+        # uuid
+        uuid_offset = len(data)
+        data += encode_u64le(self.uuid)
+        # fourcc2
+        data += reverse_str(self.fourcc2)
+        # fourcc3
+        data += reverse_str(self.fourcc3)
+        # creator_description_length
+        data += conform_byte_string(self.creator_description_len_marker)
+        # Creator description + pad until 30 bytes
+        encoded_desc = encode_str(self.creator_description)
+
+        if len(encoded_desc) > 30:
+            data += encoded_desc[:30]  # Truncate to 30 bytes
+        else:
+            to_pad = 30 - len(encoded_desc)
+            data += encoded_desc
+            data += b'\x20' * to_pad  # Pad with spaces until 30 bytes
+        
+        # Add extra padding
+        data += extra_padding(16)
+        
+        return data, timestamp_offset, uuid_offset
+        
+        
+        
+        
+
+class BTXTChunk:
+    def __init__(self, uuid, txt_lines, encoded=None, body_sink=None, stats=None, batches=None):
+        """
+        Args:
+            uuid (bytes): The file's UUID.
+            txt_lines (iterable of str or LineStore): The wrapped text lines.
+            encoded (object): Optional already encoded body used instead of `txt_lines`, e.g. a
+                cache entry. It provides `offsets` (the NUM CHAR B table) and `write_to(fp)`.
+            body_sink (file object): Optional object whose `write` also receives the encoded body.
+            stats (ConversionStats): Optional stats that encoding time is charged to.
+            batches (iterable of LineStore): Optional lines encoded elsewhere, e.g. by
+                `encode_line_batches` in worker processes, used instead of `txt_lines`.
+        """
+        self.txt_lines = txt_lines
+        self.encoded = encoded
+        self.body_sink = body_sink
+        self.stats = stats
+        self.batches = batches
+        self.offsets = None
+        self.class_id = u'BTXT'
+
+        self.num_char = 0
+        self.num_lines = 0
+        self.num_newlines = 0
+        self.uuid = uuid
+        self.footer1 = footer1
+        self.footer2 = footer2
+
+
+        
+    def create(self):
+        buffer = io.BytesIO()
+        self.write(buffer)
+        return bytearray(buffer.getvalue())
+
+    def write(self, fp):
+        """
+        Stream the chunk to a seekable binary file object.
+
+        Text lines are encoded and written a batch at a time; only the running counts and the
+        NUM CHAR B offset table are kept, and the length fields are patched in by seeking
+        back once they are known.
+
+        Args:
+            fp (file object): A seekable binary file object positioned where the chunk starts.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        chunk_start = fp.tell()
+        
+        # Reverse and add the class id
+        fp.write(reverse_str(self.class_id))
+        
+        # NUM CHAR A Index
+        num_char_a_idx = fp.tell()
+
+        # NUM CHAR A Placeholder
+        fp.write(placeholder)
+        
+        # Start count of NUM CHAR A
+        num_char_a_start = fp.tell()
+        
+        # Add bs1
+        fp.write(bs1)
+        
+        # NUM CHAR D Index
+        num_char_d_idx = fp.tell()
+
+        # NUM CHAR D Placeholder
+        fp.write(placeholder)
+        
+        # Start count of NUM CHAR D
+        num_char_d_start = fp.tell()
+        
+        # Insert text content
+        self.offsets = self.write_body(fp)
+        self.num_lines = len(self.offsets)
+        
+        # Stop count of NUM CHAR D
+        num_char_d_end = fp.tell()
+        
+        # Insert num newline chars in text content (every line ends in exactly one CR)
+        self.num_newlines = self.num_lines
+        fp.write(encode_u32le(self.num_newlines) + extra_padding(4))
+        
+        # NUM CHAR B (Recursive), written as one packed little-endian block
+        fp.write(pack_u32le_array(self.offsets))
+        
+        # Add bs2
+        fp.write(conform_byte_string(bs2))
+        
+        # Stop count of NUM CHAR A 
+        num_char_a_end = fp.tell()
+
+        # Add 'Scpt' string
+        fp.write(reverse_str('Scpt'))
+        
+        # NUM CHAR C Index
+        num_char_c_idx = fp.tell()
+
+        # NUM CHAR C Placeholder
+        fp.write(placeholder)
+        
+        # Start count of NUM CHAR C
+        num_char_c_start = fp.tell()
+        
+        # Add bs3
+        fp.write(conform_byte_string(bs3))
+        
+        # Add footer1
+        fp.write(conform_byte_string(footer1))
+        
+        # Add bs4 and 5 padding characters
+        fp.write(conform_byte_string(bs4, 5))
+        
+        # Add UUID
+        fp.write(conform_byte_string(self.uuid, 8))
+        # Add footer2
+        fp.write(conform_byte_string(footer2))
+        
+        # End count of NUM CHAR C
+        num_char_c_end = fp.tell()
+        
+        # Seek back and fill in the counts using the helper function
+        patch_count(fp, num_char_a_start, num_char_a_end, num_char_a_idx)
+        patch_count(fp, num_char_d_start, num_char_d_end, num_char_d_idx)
+        patch_count(fp, num_char_c_start, num_char_c_end, num_char_c_idx)
+        
+        return num_char_c_end - chunk_start
+
+    def write_body(self, fp):
+        """
+        Write the encoded text lines and return the NUM CHAR B offset table.
+
+        Lines are encoded a batch at a time, keeping only the running totals.
+
+        Args:
+            fp (file object): A writable binary file object.
+
+        Returns:
+            array: The running character totals, one per line.
+        """
+        if self.encoded is not None:
+            self.encoded.write_to(fp)
+            return self.encoded.offsets
+
+        if self.batches is not None:
+            batches = self.batches
+        elif isinstance(self.txt_lines, LineStore):
+            # Already encoded: write the buffer as it is
+            batches = (self.txt_lines,)
+        else:
+            batches = encode_line_batches(self.txt_lines)
+        if self.stats is not None:
+            batches = self.stats.timed(batches, 'encode')
+
+        offsets = array('I')
+        for batch in batches:
+            body = batch.view()
+            fp.write(body)
+            if self.body_sink is not None:
+                self.body_sink.write(body)
+            offsets.extend(batch.offsets(offsets[-1] if offsets else 0))
+        return offsets
+
+    
+    
+    
+    
+class AVCFile:
+    def __init__(self, input_path, output_dir=None, output_file_name=None, text_width=80, input_format=None, cache=None,
+                 stats=None, substitutions=None, jobs=None, index=False, previous=None):
+        """
+        Args:
+            input_path (str, bytes or file object): The input file path, or for in-memory conversion
+                the input bytes, a binary stream or a text stream (TXT only).
+            output_dir (str): The directory `create` writes to. Not needed when only using `write`.
+            output_file_name (str): Optional output name (without extension) for `create`.
+            text_width (int): The maximum line width used when wrapping text.
+            input_format (str): A registered format name such as 'txt', 'docx' or 'fdx' (see
+                `avc.formats`). Taken from the file extension, or else sniffed from the first
+                bytes, when not given.
+            cache (ConversionCache): Optional cache of encoded bodies to read from and fill.
+            stats (ConversionStats): Optional stats object filled in by the conversion. One is created
+                automatically when hooks are registered with `avc.stats.register_hook`.
+            substitutions (dict or Substitutions): Optional text substitutions applied to each
+                paragraph before wrapping, e.g. `avc.substitutions.SCRIPTSYNC_SUBSTITUTIONS`.
+            jobs (int): Worker processes used to wrap and encode a large input in chunks. None or 1
+                converts in-process; inputs under `avc.parallel.MIN_PARALLEL_SIZE` always do.
+            index (bool): Record each paragraph's digest, line count and encoded size in
+                `paragraph_index` while converting; `create` saves it next to the .avc file,
+                so a later revision of the script can be converted with `previous`.
+            previous (str): An earlier .avc file of the same script, converted with `index`.
+                Paragraphs that haven't changed since are copied from it instead of being
+                wrapped and encoded again. Implies `index`.
+        """
+        self.name = output_file_name
+        self.output_dir = output_dir
+        self.full_path = None
+        self.input_file = input_path
+        self.input_format = normalize_input_format(input_format) if input_format else detect_format(input_path)
+        self.txt_lines = None
+        self.text_width = text_width
+        self.uuid = generate_truncated_uuidv7()
+        self.header = None
+        self.btxt_chunk = None
+        self.cache = cache
+        self.cache_hit = False
+        self.stats = stats
+        self.substitutions = compile_substitutions(substitutions)
+        self.jobs = jobs
+        self.index = index or previous is not None
+        self.previous = previous
+        self.paragraph_index = None
+
+    def read_paragraphs(self):
+        """
+        Set up the lazy reader for the input.
+
+        Returns:
+            iterator of str: The paragraphs (TXT lines, DOCX or FDX paragraphs), before wrapping.
+        """
+        if self.input_format is None:
+            raise ValueError(f"The input format could not be determined: pass input_format as one of "
+                             f"{', '.join(input_formats())}.")
+
+        # Each format's reader is only imported once an input of that format needs converting.
+        # Paragraphs are read, wrapped and encoded lazily as the BTXT chunk is written
+        paragraphs = get_format(self.input_format).read(self.input_file)
+
+        if self.stats is not None:
+            paragraphs = self.stats.timed(paragraphs, 'read')
+        return paragraphs
+
+    def read_lines(self):
+        """
+        Set up the lazy read -> wrap pipeline for the input and store it in `txt_lines`.
+
+        Returns:
+            iterator of str: The wrapped text lines.
+        """
+        lines = self.read_paragraphs()
+
+        if self.substitutions is not None:
+            # Substitute whole paragraphs in one pass each, before they are wrapped
+            lines = map(self.substitutions, lines)
+            if self.stats is not None:
+                lines = self.stats.timed(lines, 'substitute')
+
+        self.txt_lines = get_format(self.input_format).wrap(lines, self.text_width)
+        if self.stats is not None:
+            self.txt_lines = self.stats.timed(self.txt_lines, 'wrap')
+        return self.txt_lines
+
+    def _use_parallel(self):
+        if self.jobs is None or self.jobs <= 1:
+            return False
+        from .parallel import MIN_PARALLEL_SIZE
+        size = self._input_size()
+        return size is None or size >= MIN_PARALLEL_SIZE
+
+    def _switch_stage(self, stage):
+        if self.stats is not None:
+            self.stats.switch(stage)
+
+    def _input_size(self):
+        if isinstance(self.input_file, (str, os.PathLike)):
+            return os.path.getsize(self.input_file)
+        if isinstance(self.input_file, (bytes, bytearray)):
+            return len(self.input_file)
+        if isinstance(self.input_file, memoryview):
+            return self.input_file.nbytes
+        return None
+
+    def _start_stats(self, stage):
+        if self.stats is None and hooks_registered():
+            self.stats = ConversionStats()
+        if self.stats is None:
+            return
+        self.stats.start(stage)
+        self.stats.input_format = self.input_format
+        if isinstance(self.input_file, (str, os.PathLike)):
+            self.stats.input_path = os.fspath(self.input_file)
+        self.stats.bytes_in = self._input_size()
+
+    def _finish_stats(self, written):
+        if self.stats is None:
+            return
+        self.stats.stop()
+        self.stats.output_path = self.full_path
+        self.stats.bytes_out = written
+        self.stats.lines = self.btxt_chunk.num_lines
+        self.stats.cache_hit = self.cache_hit
+        run_hooks(self.stats)
+
+    def write(self, output):
+        """
+        Convert the input and write the .avc data to a binary file object.
+
+        Seekable outputs receive the data directly. Anything else (pipes, sockets, response
+        bodies) gets it copied from a spooled buffer, since the length fields can only be
+        filled in once the text has been written.
+
+        Args:
+            output (file object): A writable binary file object.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        self._start_stats('write')
+        written = self._write(output)
+        self._finish_stats(written)
+        return written
+
+    def _write(self, output):
+        cached = cache_writer = previous = None
+        if self.cache is not None and self.txt_lines is None and self.input_format is not None and not self.index:
+            self._switch_stage('cache')
+            key = self.cache.key(self.input_file, self.input_format, self.text_width, self.substitutions)
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is None:
+                    cache_writer = self.cache.writer(key)
+        self.cache_hit = cached is not None
+
+        batches = None
+        if cached is None and self.txt_lines is None:
+            self._switch_stage('read')
+            if self.index:
+                batches, previous = self._indexed_batches()
+            elif self._use_parallel():
+                from .parallel import iter_parallel_batches
+                batches = iter_parallel_batches(self.read_paragraphs(), self.input_format, self.text_width,
+                                                self.substitutions, self.jobs)
+            else:
+                self.read_lines()
+        self._switch_stage('write')
+
+        self.header = AVCHeader(self.uuid)
+        self.btxt_chunk = BTXTChunk(self.uuid, self.txt_lines, encoded=cached, body_sink=cache_writer, stats=self.stats,
+                                    batches=batches)
+
+        try:
+            written = self._write_output(output)
+        except BaseException:
+            if cache_writer is not None:
+                cache_writer.discard()
+            raise
+        finally:
+            if cached is not None:
+                cached.close()
+            if previous is not None:
+                previous.close()
+
+        if cache_writer is not None:
+            try:
+                cache_writer.commit(self.btxt_chunk.offsets)
+            except OSError as e:
+                # The output is complete; a cache entry that can't be published is only a missed speed-up
+                cache_writer.discard()
+                logger.warning("Could not add the conversion to the cache: %s", e)
+        return written
+
+    def _indexed_batches(self):
+        from .incremental import ParagraphIndex, PreviousConversion, iter_indexed_batches, paragraph_wrapper, settings_digest
+
+        settings = settings_digest(self.input_format, self.text_width, self.substitutions)
+        previous = PreviousConversion.open(self.previous, settings) if self.previous is not None else None
+        self.paragraph_index = ParagraphIndex(settings)
+        wrap = paragraph_wrapper(self.input_format, self.text_width, self.substitutions)
+        return iter_indexed_batches(self.read_paragraphs(), wrap, self.paragraph_index, previous), previous
+
+    def save_index(self, avc_path=None):
+        """
+        Save the paragraph index recorded by a conversion with `index` next to its .avc file.
+
+        Args:
+            avc_path (str): The .avc file the conversion was written to. Defaults to the file `create` made.
+        """
+        from .incremental import index_path
+        self.paragraph_index.save(index_path(avc_path or self.full_path), self.uuid)
+
+    def _write_output(self, output):
+        if not _is_seekable(output):
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE) as spool:
+                written = self._write_seekable(spool)
+                spool.seek(0)
+                shutil.copyfileobj(spool, output)
+            return written
+
+        return self._write_seekable(output)
+
+    def _write_seekable(self, fp):
+        # Write the header, then stream the BTXT chunk straight after it
+        header_data = self.header.create()
+        fp.write(header_data)
+        return len(header_data) + self.btxt_chunk.write(fp)
+
+    def create(self):
+        self._start_stats('name')
+
+        # Step 2: Determine the requested name
+        if self.name is None:
+            if not isinstance(self.input_file, (str, os.PathLike)):
+                raise ValueError("An output file name is required when the input is not a file path.")
+            # Split the base name and the extension
+            base_name, ext = os.path.splitext(os.path.basename(self.input_file))
+        else:
+            base_name = self.name
+    
+        # Step 3: Claim a unique path (56-character limit, "(n)" suffixes) by creating it exclusively
+        self.full_path, fd = claim_output_path(self.output_dir, base_name)
+
+        # The input is only read while writing, so don't leave a partial file behind if that fails
+        try:
+            self._switch_stage('write')
+            with os.fdopen(fd, 'wb') as avc:
+                written = self._write(avc)
+        except BaseException:
+            os.remove(self.full_path)
+            raise
+        
+        if self.index:
+            self.save_index()
+        self._finish_stats(written)
+        logger.info("AVC file created successfully at %s", self.full_path)
+        return self.full_path
+        
+ 
+
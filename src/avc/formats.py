@@ -0,0 +1,218 @@
+import importlib
+import io
+import os
+from collections import OrderedDict, namedtuple
+
+# Leading bytes of an input looked at to recognise its format when the extension doesn't tell
+SNIFF_SIZE = 1024
+
+UTF8_BOM = b'\xef\xbb\xbf'
+
+
+class InputFormat(namedtuple('InputFormat', ['name', 'extensions', 'reader', 'wrapper', 'magic', 'marker', 'check'])):
+    """
+    An input format, as registered with `register_format`.
+
+    The reader and wrapper are normally given as 'module:function' paths and only imported the
+    first time a file of the format is converted, so registering a format costs nothing. Such a
+    format is a plain tuple of strings and bytes, so it can be sent to worker processes as is.
+
+    Attributes:
+        name (str): The format name, e.g. 'docx'.
+        extensions (tuple of str): The file extensions, in lower case with the dot, e.g. ('.docx',).
+        reader (str or function): reader(source) -> iterator of paragraph texts, where `source`
+            is a path, bytes or a binary stream.
+        wrapper (str or function): wrapper(paragraphs, width, last=True) -> iterator of wrapped
+            lines; `last` says whether the paragraphs end the document.
+        magic (tuple of bytes): Prefixes that identify the format's files.
+        marker (bytes or None): Bytes that must also appear in the first `SNIFF_SIZE` bytes.
+        check (str, function or None): check(source) -> bool, confirming a sniffed match when
+            the first bytes aren't enough (e.g. any zip file starts like a DOCX).
+    """
+    __slots__ = ()
+
+    def load(self):
+        """
+        Import the reader and wrapper now rather than on first use, e.g. to warm up a worker process.
+        """
+        _load(self.reader)
+        _load(self.wrapper)
+
+    def read(self, source):
+        """
+        Read the paragraphs of an input lazily.
+
+        Returns:
+            iterator of str: The paragraphs, before wrapping.
+        """
+        return _load(self.reader)(source)
+
+    def wrap(self, paragraphs, width=80, last=True):
+        """
+        Wrap a stream of paragraphs into text lines.
+
+        Returns:
+            iterator of str: The wrapped lines.
+        """
+        return _load(self.wrapper)(paragraphs, width, last=last)
+
+    def sniff(self, head):
+        return bool(self.magic) and head.startswith(self.magic) and (self.marker is None or self.marker in head)
+
+
+_FORMATS = OrderedDict()
+
+
+def _load(target):
+    if callable(target):
+        return target
+    module_name, _, attribute = target.partition(':')
+    return getattr(importlib.import_module(module_name, __package__), attribute)
+
+
+def register_format(name, extensions, reader, wrapper='.docx_utils:iter_paragraph_lines', magic=(), marker=None,
+                    check=None):
+    """
+    Register an input format, or replace the one registered under the same name.
+
+    The default wrapper joins the paragraphs with line breaks and wraps the result, as for
+    DOCX; TXT wraps each line on its own instead.
+
+    Args:
+        name (str): The format name, as passed to `-f` and `input_format`.
+        extensions (iterable of str): The file extensions, e.g. ['.fdx'].
+        reader (str or function): The paragraph reader or its 'module:function' path
+            (relative to this package when it starts with a dot).
+        wrapper (str or function): The paragraph wrapper or its 'module:function' path.
+        magic (iterable of bytes): Prefixes that identify the format's files when sniffing.
+        marker (bytes): Optional bytes that must also appear near the start of the file.
+        check (str or function): Optional check(source) -> bool, or its 'module:function' path,
+            run on a path, bytes or seekable stream whose first bytes matched.
+
+    Returns:
+        InputFormat: The registered format.
+    """
+    name = name.lower()
+    extensions = tuple('.' + extension.lower().lstrip('.') for extension in extensions)
+    input_format = InputFormat(name, extensions, reader, wrapper, tuple(magic), marker, check)
+    _FORMATS[name] = input_format
+    return input_format
+
+
+def input_formats():
+    """
+    Return the names of the registered input formats, in registration order.
+    """
+    return list(_FORMATS)
+
+
+def supported_extensions():
+    """
+    Return the file extensions of every registered input format, e.g. ('.txt', '.docx', '.fdx').
+    """
+    return tuple(extension for input_format in _FORMATS.values() for extension in input_format.extensions)
+
+
+def get_format(name):
+    """
+    Look up an input format by a name or hint such as 'TXT' or '.docx'.
+
+    Returns:
+        InputFormat: The registered format.
+
+    Raises:
+        ValueError: If no such format is registered.
+    """
+    try:
+        return _FORMATS[name.lower().lstrip('.')]
+    except KeyError:
+        raise ValueError(f"Unsupported input format '{name}': must be one of {', '.join(_FORMATS)}.")
+
+
+def format_from_path(path):
+    """
+    Return the name of the input format implied by a file path's extension, or None if there isn't one.
+    """
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    for input_format in _FORMATS.values():
+        if extension in input_format.extensions:
+            return input_format.name
+    return None
+
+
+def sniff_format(head):
+    """
+    Recognise an input format from the first bytes of a file.
+
+    This only looks at the bytes; `detect_format` also runs the format's `check` where it can.
+
+    Args:
+        head (bytes): The first `SNIFF_SIZE` (or fewer) bytes.
+
+    Returns:
+        str or None: The format name, or None if no registered format claims the bytes.
+    """
+    if head.startswith(UTF8_BOM):
+        head = head[len(UTF8_BOM):]
+    head = head.lstrip()
+    for input_format in _FORMATS.values():
+        if input_format.sniff(head):
+            return input_format.name
+    return None
+
+
+def _confirm(name, source):
+    check = _FORMATS[name].check if name is not None else None
+    if check is None:
+        return name
+    if hasattr(source, 'read'):
+        position = source.tell()
+        try:
+            confirmed = _load(check)(source)
+        finally:
+            source.seek(position)
+    else:
+        confirmed = _load(check)(source)
+    return name if confirmed else None
+
+
+def detect_format(source):
+    """
+    Work out the input format of a path (from its extension, or else its first bytes), of
+    bytes, or of a binary stream (without consuming any of it).
+
+    A match on the first bytes is confirmed with the format's `check`, except for streams that
+    can't seek back (such as stdin), where only the first bytes can be looked at.
+
+    Returns:
+        str or None: The format name, or None if it can't be told.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        name = format_from_path(source)
+        if name is None:
+            try:
+                with open(source, 'rb') as fp:
+                    name = sniff_format(fp.read(SNIFF_SIZE))
+                name = _confirm(name, source)
+            except OSError:
+                return None
+        return name
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return _confirm(sniff_format(bytes(source[:SNIFF_SIZE])), source)
+    if isinstance(source, io.TextIOBase):
+        return None
+    if hasattr(source, 'seekable') and source.seekable():
+        position = source.tell()
+        head = source.read(SNIFF_SIZE)
+        source.seek(position)
+        return _confirm(sniff_format(head), source)
+    if hasattr(source, 'peek'):
+        return sniff_format(source.peek(SNIFF_SIZE)[:SNIFF_SIZE])
+    return None
+
+
+register_format('txt', ['.txt'], '.txt_utils:iter_txt_file_lines', '.txt_utils:iter_wrapped_lines')
+register_format('docx', ['.docx'], '.docx_utils:iter_docx_paragraphs', magic=[b'PK\x03\x04'], check='.docx_utils:is_docx')
+register_format('fdx', ['.fdx'], '.fdx_utils:iter_fdx_paragraphs', magic=[b'<?xml', b'<FinalDraft'],
+                marker=b'<FinalDraft')
@@ -0,0 +1,357 @@
+import hashlib
+import logging
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, chain
+from operator import lt, sub
+from . import __version__
+from .linestore import LineStore, encode_lines
+from .formats import get_format
+from .reader import AVCReader
+from .utils import pack_u32le_array
+
+logger = logging.getLogger(__name__)
+
+# The sidecar index is written next to the .avc file, as <name>.avc.pyavc-index
+INDEX_SUFFIX = '.pyavc-index'
+
+# Index layout: magic, the .avc file's UUID, the settings digest and the paragraph count, then
+# the paragraph digests, their numbers of wrapped lines (u32le) and their encoded sizes (u32le)
+INDEX_MAGIC = b'PYAVCI01'
+INDEX_HEADER = struct.Struct('<8s8s16sI')
+DIGEST_SIZE = 16
+
+BATCH_SIZE = 4096
+
+
+def index_path(avc_path):
+    """
+    Return the path of the paragraph index kept next to an .avc file.
+    """
+    return os.fspath(avc_path) + INDEX_SUFFIX
+
+
+def settings_digest(input_format, text_width, substitutions=None):
+    """
+    Digest everything besides the text itself that decides how a paragraph is wrapped and encoded.
+
+    Returns:
+        bytes: 16 bytes; an index is only reused under the same digest.
+    """
+    digest = hashlib.sha256(f"{__version__}\0{input_format}\0{text_width}\0".encode('utf-8'))
+    if substitutions:
+        digest.update(f"{substitutions.fingerprint()}\0".encode('utf-8'))
+    return digest.digest()[:16]
+
+
+def paragraph_digest(paragraph):
+    return hashlib.blake2b(paragraph.encode('utf-8', 'surrogatepass'), digest_size=DIGEST_SIZE).digest()
+
+
+class ParagraphIndex:
+    """
+    The paragraph index of an .avc file: for each input paragraph, in order, a digest of its text
+    and the number of lines and encoded bytes it became in the BTXT body.
+
+    Paragraphs are wrapped independently of each other, so a paragraph whose digest is unchanged
+    in a later revision of the script becomes the same lines again, and its bytes can be copied.
+
+    Args:
+        settings (bytes): The `settings_digest` the paragraphs were converted with.
+        uuid (bytes): The UUID of the .avc file the index describes, once known.
+    """
+
+    def __init__(self, settings, uuid=None):
+        self.settings = settings
+        self.uuid = uuid
+        self.digests = []
+        self.lines = array('I')
+        self.sizes = array('I')
+        # Paragraphs copied from a previous conversion rather than wrapped and encoded
+        self.reused = 0
+
+    def __len__(self):
+        return len(self.digests)
+
+    def append(self, digest, num_lines, num_bytes):
+        self.digests.append(digest)
+        self.lines.append(num_lines)
+        self.sizes.append(num_bytes)
+
+    def extend(self, other, start, stop):
+        """
+        Append the records of paragraphs `start` to `stop` of another index.
+        """
+        self.digests.extend(other.digests[start:stop])
+        self.lines.extend(other.lines[start:stop])
+        self.sizes.extend(other.sizes[start:stop])
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an index file.
+
+        Raises:
+            ValueError: If the file is not a complete paragraph index.
+        """
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        try:
+            magic, uuid, settings, count = INDEX_HEADER.unpack_from(data)
+        except struct.error:
+            raise ValueError("Truncated paragraph index")
+        if magic != INDEX_MAGIC:
+            raise ValueError("Not a pyavc paragraph index")
+        if len(data) != INDEX_HEADER.size + count * (DIGEST_SIZE + 8):
+            raise ValueError("Truncated paragraph index")
+
+        index = cls(settings, uuid)
+        start = INDEX_HEADER.size
+        end = start + count * DIGEST_SIZE
+        index.digests = [data[position:position + DIGEST_SIZE] for position in range(start, end, DIGEST_SIZE)]
+        index.lines.frombytes(data[end:end + count * 4])
+        index.sizes.frombytes(data[end + count * 4:])
+        if sys.byteorder == 'big':
+            index.lines.byteswap()
+            index.sizes.byteswap()
+        return index
+
+    def save(self, path, uuid):
+        """
+        Write the index for the .avc file with `uuid`, replacing the file atomically.
+        """
+        self.uuid = uuid
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix='.tmp-',
+                                        suffix=INDEX_SUFFIX)
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(INDEX_HEADER.pack(INDEX_MAGIC, uuid, self.settings, len(self)))
+                fp.write(b''.join(self.digests))
+                fp.write(pack_u32le_array(self.lines))
+                fp.write(pack_u32le_array(self.sizes))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class PreviousConversion:
+    """
+    An earlier .avc file of a script together with its paragraph index, opened so that runs of
+    unchanged paragraphs can be copied out of it.
+
+    Use `open`, which checks that the two belong together. Close it once the new file is written.
+    """
+
+    def __init__(self, reader, index):
+        self.reader = reader
+        self.index = index
+        self.line_starts = array('Q', accumulate(chain((0,), index.lines)))
+        self.byte_starts = array('Q', accumulate(chain((0,), index.sizes)))
+
+    @classmethod
+    def open(cls, avc_path, settings):
+        """
+        Open an .avc file and its index.
+
+        Args:
+            avc_path (str): The earlier .avc file.
+            settings (bytes): The `settings_digest` of the new conversion.
+
+        Returns:
+            PreviousConversion or None: None, with the reason logged, when the file has no usable
+            index and the new conversion has to start from scratch.
+        """
+        try:
+            index = ParagraphIndex.load(index_path(avc_path))
+        except (OSError, ValueError) as e:
+            logger.info("No paragraph index for %s (%s); converting in full.", avc_path, e)
+            return None
+        if index.settings != settings:
+            logger.info("%s was converted with other settings; converting in full.", avc_path)
+            return None
+
+        try:
+            reader = AVCReader(avc_path)
+        except (OSError, ValueError) as e:
+            logger.info("Could not read %s (%s); converting in full.", avc_path, e)
+            return None
+        if (reader.uuid != index.uuid or sum(index.lines) != reader.num_lines
+                or sum(index.sizes) != reader.num_char_d):
+            reader.close()
+            logger.info("The paragraph index does not match %s; converting in full.", avc_path)
+            return None
+        return cls(reader, index)
+
+    def span(self, start, stop):
+        """
+        Return the encoded lines of paragraphs `start` to `stop`, without copying them.
+
+        Returns:
+            LineStore: A store over the mapped text.
+        """
+        first, last = self.line_starts[start], self.line_starts[stop]
+        offsets = self.reader.offsets[first:last]
+        base = self.reader.offsets[first - 1] if first else 0
+        lengths = array('I', map(sub, offsets, chain((base,), offsets)))
+        text = self.reader.text[self.byte_starts[start]:self.byte_starts[stop]]
+        return LineStore(text, lengths)
+
+    def close(self):
+        self.reader.close()
+
+
+def paragraph_wrapper(input_format, width=80, substitutions=None):
+    """
+    Return a function that wraps one paragraph on its own, as the full pipeline would.
+
+    Returns:
+        function: wrap(paragraph, last) -> list of str, where `last` says whether the paragraph
+        ends the document.
+    """
+    input_format = get_format(input_format)
+
+    def wrap(paragraph, last):
+        if substitutions is not None:
+            paragraph = substitutions(paragraph)
+        return list(input_format.wrap((paragraph,), width, last=last))
+    return wrap
+
+
+def _mark_last(paragraphs):
+    paragraphs = iter(paragraphs)
+    paragraph = next(paragraphs, None)
+    while paragraph is not None:
+        following = next(paragraphs, None)
+        yield paragraph, following is None
+        paragraph = following
+
+
+def _encode_paragraphs(paragraphs, wrap, index, batch_size):
+    store = LineStore(bytearray())
+    for paragraph, last in paragraphs:
+        lines = wrap(paragraph, last)
+        data = encode_lines(lines) if lines else b''
+        store.data += data
+        store.lengths.extend(map(len, lines))
+        index.append(paragraph_digest(paragraph), len(lines), len(data))
+        if len(store) >= batch_size:
+            yield store
+            store = LineStore(bytearray())
+    if len(store):
+        yield store
+
+
+def _anchors(old, new):
+    # Paragraphs that occur exactly once on both sides, longest run in the same order
+    # (patience diff); everything else is matched by growing the runs around them
+    old_counts = Counter(old)
+    new_counts = Counter(new)
+    old_positions = {digest: i for i, digest in enumerate(old) if old_counts[digest] == 1}
+    pairs = [(old_positions[digest], j) for j, digest in enumerate(new)
+             if new_counts[digest] == 1 and digest in old_positions]
+    if all(map(lt, pairs, pairs[1:])):
+        # Nothing was moved, which is the usual case
+        return pairs
+
+    tails = []
+    tail_pairs = []
+    previous = [None] * len(pairs)
+    for k, (i, j) in enumerate(pairs):
+        position = bisect_left(tails, i)
+        if position:
+            previous[k] = tail_pairs[position - 1]
+        if position == len(tails):
+            tails.append(i)
+            tail_pairs.append(k)
+        else:
+            tails[position] = i
+            tail_pairs[position] = k
+
+    anchors = []
+    k = tail_pairs[-1] if tail_pairs else None
+    while k is not None:
+        anchors.append(pairs[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+
+def matching_runs(old, new):
+    """
+    Find runs of paragraphs that are unchanged between two revisions.
+
+    Args:
+        old (list): The previous revision's paragraph digests.
+        new (list): The new revision's paragraph digests.
+
+    Returns:
+        list of tuple: (old start, new start, length) for each run, in order.
+    """
+    runs = []
+    old_end = new_end = 0
+    for i, j in chain(((0, 0),), _anchors(old, new)):
+        if i < old_end or j < new_end or old[i:i + 1] != new[j:j + 1]:
+            continue
+        # Grow the run backwards to the previous one, then forwards as far as it goes
+        while i > old_end and j > new_end and old[i - 1] == new[j - 1]:
+            i -= 1
+            j -= 1
+        size = 0
+        while i + size < len(old) and j + size < len(new) and old[i + size] == new[j + size]:
+            size += 1
+        runs.append((i, j, size))
+        old_end, new_end = i + size, j + size
+    return runs
+
+
+def _update_paragraphs(paragraphs, wrap, index, previous, batch_size):
+    old = list(previous.index.digests)
+    new = [paragraph_digest(paragraph) for paragraph in paragraphs]
+    # How the final paragraph wraps depends on it being last (a trailing DOCX line break is
+    # dropped), so the old and new final paragraphs are always wrapped afresh
+    if old:
+        old[-1] = None
+    if new:
+        new[-1] = False
+
+    final = len(paragraphs) - 1
+    position = 0
+    for i, j, size in chain(matching_runs(old, new), ((len(old), len(new), 0),)):
+        if position < j:
+            changed = ((paragraphs[k], k == final) for k in range(position, j))
+            yield from _encode_paragraphs(changed, wrap, index, batch_size)
+        if size:
+            index.extend(previous.index, i, i + size)
+            index.reused += size
+            yield previous.span(i, i + size)
+        position = j + size
+
+
+def iter_indexed_batches(paragraphs, wrap, index, previous=None, batch_size=BATCH_SIZE):
+    """
+    Wrap and encode paragraphs one at a time, recording each of them in `index`.
+
+    With `previous`, the paragraphs are first diffed against the previous conversion's index;
+    runs of unchanged paragraphs are copied from its BTXT body and NUM CHAR B table instead,
+    and only the changed ones are wrapped and encoded. Either way the stores can be fed to
+    `BTXTChunk(batches=...)`, which recomputes the running totals and length fields.
+
+    Args:
+        paragraphs (iterable of str): The paragraphs, as read from the input.
+        wrap (function): The paragraph wrapper, from `paragraph_wrapper`.
+        index (ParagraphIndex): The index to fill in.
+        previous (PreviousConversion): Optional earlier conversion to copy from.
+        batch_size (int): The number of lines per newly encoded store.
+
+    Returns:
+        generator of LineStore: The encoded lines, in order.
+    """
+    if previous is None:
+        return _encode_paragraphs(_mark_last(paragraphs), wrap, index, batch_size)
+    return _update_paragraphs(list(paragraphs), wrap, index, previous, batch_size)
@@ -0,0 +1,160 @@
+import os
+import threading
+
+# Avid truncates bin item names, so output names are capped (including any "(n)" suffix)
+MAX_BASE_LENGTH = 56
+
+_namers = {}
+_namers_lock = threading.Lock()
+
+
+def output_base_name(name):
+    """
+    Trim trailing whitespace from an output name and enforce the 56-character limit.
+
+    Args:
+        name (str): The requested name, without extension.
+
+    Returns:
+        str: The base name used for the .avc file.
+    """
+    return name.rstrip()[:MAX_BASE_LENGTH]
+
+
+def candidate_name(base_name, count):
+    """
+    Return the file name for the `count`-th attempt at `base_name`: 'name.avc', then 'name(1).avc',
+    'name(2).avc', ..., truncating the base so the name stays within the limit.
+
+    Args:
+        base_name (str): The base name, as returned by `output_base_name`.
+        count (int): 0 for the plain name, otherwise the suffix number.
+
+    Returns:
+        str: The file name.
+    """
+    if count == 0:
+        return f"{base_name}.avc"
+    suffix = f"({count})"
+    return f"{base_name[:MAX_BASE_LENGTH - len(suffix)]}{suffix}.avc"
+
+
+class OutputNamer:
+    """
+    Hands out unique .avc names in one output directory.
+
+    The directory is listed once; after that, taken names and the next suffix to try for each
+    base name are tracked in memory, so repeated conversions of the same name cost O(1) instead
+    of a stat per existing suffix. Every name is claimed with an exclusive create, so concurrent
+    writers (threads, worker processes, other machines on a share) can never overwrite each
+    other: a writer that loses the race just moves on to the next suffix.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._taken = None
+        self._next_count = {}
+
+    def claim(self, base_name):
+        """
+        Atomically create the first free .avc file for `base_name`.
+
+        Args:
+            base_name (str): The base name, as returned by `output_base_name`.
+
+        Returns:
+            tuple: (path, file descriptor) of the newly created, empty file, opened for writing.
+        """
+        with self._lock:
+            if self._taken is None:
+                self._taken = set(os.listdir(self.output_dir))
+
+            count = self._next_count.get(base_name, 0)
+            while True:
+                file_name = candidate_name(base_name, count)
+                count += 1
+                if file_name in self._taken:
+                    continue
+
+                path = os.path.join(self.output_dir, file_name)
+                try:
+                    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+                except FileExistsError:
+                    # Created by someone outside this process since the directory was listed
+                    self._taken.add(file_name)
+                    continue
+
+                self._taken.add(file_name)
+                self._next_count[base_name] = count
+                return path, fd
+
+
+def get_namer(output_dir):
+    """
+    Return the process-wide `OutputNamer` for a directory.
+
+    Args:
+        output_dir (str): The output directory.
+
+    Returns:
+        OutputNamer: The namer shared by every conversion into that directory.
+    """
+    key = os.path.normcase(os.path.abspath(output_dir))
+    with _namers_lock:
+        namer = _namers.get(key)
+        if namer is None:
+            namer = _namers[key] = OutputNamer(output_dir)
+        return namer
+
+
+def claim_output_path(output_dir, name):
+    """
+    Claim a unique .avc file in `output_dir` for the requested name, never overwriting an existing file.
+
+    Args:
+        output_dir (str): The output directory.
+        name (str): The requested name, without extension.
+
+    Returns:
+        tuple: (path, file descriptor) of the newly created, empty file, opened for writing.
+    """
+    return get_namer(output_dir).claim(output_base_name(name))
+
+
+class ArchiveNamer:
+    """
+    Hands out unique .avc member names inside an output archive, following the same rules as
+    `OutputNamer`: the 56-character limit and "(n)" suffixes, per directory of the archive.
+
+    Names are compared case-insensitively, since archives are mostly extracted onto file systems
+    that are.
+    """
+
+    def __init__(self):
+        self._taken = set()
+        self._next_count = {}
+
+    def claim(self, directory, name):
+        """
+        Take the first free .avc name for `name` in `directory`.
+
+        Args:
+            directory (str): The directory inside the archive, '' for the top level.
+            name (str): The requested name, without extension.
+
+        Returns:
+            str: The member name, e.g. 'Episode 1/script(1).avc'.
+        """
+        base_name = output_base_name(name)
+        key = (directory.casefold(), base_name.casefold())
+        count = self._next_count.get(key, 0)
+        while True:
+            member = candidate_name(base_name, count)
+            if directory:
+                member = f"{directory}/{member}"
+            count += 1
+            if member.casefold() not in self._taken:
+                self._taken.add(member.casefold())
+                self._next_count[key] = count
+                return member
@@ -0,0 +1,88 @@
+import os
+from collections import deque
+from .formats import get_format
+from .linestore import LineStore
+
+# Characters of input text handed to a worker process at a time
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Inputs smaller than this are converted serially; starting the workers would cost more than it saves
+MIN_PARALLEL_SIZE = 2 * CHUNK_SIZE
+
+
+def iter_paragraph_chunks(paragraphs, chunk_size=CHUNK_SIZE):
+    """
+    Group paragraphs into lists of about `chunk_size` characters, never splitting a paragraph.
+
+    Args:
+        paragraphs (iterable of str): The paragraphs (TXT lines, DOCX or FDX paragraphs).
+        chunk_size (int): The target number of characters per chunk.
+
+    Returns:
+        generator of list: The chunks, in order.
+    """
+    chunk = []
+    size = 0
+    for paragraph in paragraphs:
+        chunk.append(paragraph)
+        size += len(paragraph)
+        if size >= chunk_size:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+def _wrap_and_encode(job):
+    # Runs inside a worker process: wrap one chunk and encode it into a single store
+    input_format, paragraphs, width, substitutions, last = job
+    if substitutions is not None:
+        paragraphs = map(substitutions, paragraphs)
+    return LineStore.from_lines(input_format.wrap(paragraphs, width, last=last))
+
+
+def iter_parallel_batches(paragraphs, input_format, width=80, substitutions=None, jobs=None, chunk_size=CHUNK_SIZE):
+    """
+    Wrap and encode paragraphs in worker processes, yielding the encoded chunks in input order.
+
+    The paragraphs are split into chunks at paragraph boundaries. Each chunk is wrapped and
+    encoded on its own, which gives the same lines as the serial pipeline, so the stores can
+    be fed to `BTXTChunk(batches=...)` to produce a byte-identical chunk. Only a couple of
+    chunks per worker are in flight at once, so memory stays bounded for very large inputs.
+
+    Args:
+        paragraphs (iterable of str): The paragraphs, as read from the input.
+        input_format (str): The registered input format name, e.g. 'txt'.
+        width (int): The maximum line width.
+        substitutions (Substitutions): Optional substitutions applied to each paragraph.
+        jobs (int): The number of worker processes. Defaults to the number of CPUs.
+        chunk_size (int): The target number of characters per chunk.
+
+    Returns:
+        generator of LineStore: One store per chunk.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    jobs = jobs or os.cpu_count() or 1
+    # The format itself goes to the workers, so ones registered at run time work under spawn too
+    input_format = get_format(input_format)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        try:
+            chunks = iter_paragraph_chunks(paragraphs, chunk_size)
+            chunk = next(chunks, None)
+            while chunk is not None:
+                # Look one chunk ahead: the last one has to know it ends the document
+                following = next(chunks, None)
+                pending.append(executor.submit(_wrap_and_encode, (input_format, chunk, width, substitutions,
+                                                                  following is None)))
+                chunk = following
+                if len(pending) >= jobs * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,392 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from .bytestrings import footer1, footer2, bs1, bs2, bs3, bs4
+from .file import AVCHeader, TIMESTAMP_LEN, UUID_LEN
+from .utils import conform_byte_string, running_totals
+
+# Text is decoded a block at a time when the lines are checked against the NUM CHAR B table
+CHECK_BLOCK_SIZE = 4 * 1024 * 1024
+
+U32 = struct.Struct('<I')
+
+# The BTXT trailer: everything from the start of NUM CHAR C is fixed except the UUID
+TRAILER_PREFIX = conform_byte_string(bs3) + conform_byte_string(footer1) + conform_byte_string(bs4, 5)
+TRAILER_SUFFIX = bytes(UUID_LEN) + conform_byte_string(footer2)
+NUM_CHAR_C = len(TRAILER_PREFIX) + UUID_LEN + len(TRAILER_SUFFIX)
+
+# The header's fourccs and creator length marker follow the UUID; zero padding ends it
+HEADER_FOURCC_LEN = 10
+HEADER_PADDING_LEN = 16
+
+
+class AVCReader:
+    """
+    Read an .avc file back through a memory map.
+
+    The header and the BTXT chunk are parsed in place: the text and the NUM CHAR B table are
+    memoryview slices of the map, and nothing is copied until a line is asked for. Lines are
+    found by index from the offset table when the text is plain ASCII (each line then starts
+    at its character total plus the CRs before it), and otherwise from the CRs, which are only
+    scanned for once.
+
+    Anything that makes the layout unreadable raises ValueError when the file is opened;
+    `validate` reports everything else. Close the reader (or use it as a context manager)
+    once done, after releasing any views taken from it.
+
+    Args:
+        path (str): The .avc file.
+    """
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self._mm = None
+        self._view = None
+        self.text = None
+        self.offsets = None
+        self._ends = None
+
+        with open(self.path, 'rb') as fp:
+            try:
+                self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("The file is empty.")
+        self._view = memoryview(self._mm)
+        try:
+            self._parse()
+        except BaseException:
+            self.close()
+            raise
+
+    def _u32(self, position):
+        if position + U32.size > len(self._mm):
+            raise ValueError(f"The file ends at byte {len(self._mm)}, inside the BTXT chunk.")
+        return U32.unpack_from(self._mm, position)[0]
+
+    def _parse(self):
+        template, timestamp_offset, uuid_offset = AVCHeader.compile_template()
+        self.header_size = len(template)
+        self.size = len(self._mm)
+        if self._view[:timestamp_offset] != template[:timestamp_offset]:
+            raise ValueError("Not an AVC file: the header does not start with the AVC magic.")
+
+        self.timestamp = str(self._view[timestamp_offset:timestamp_offset + TIMESTAMP_LEN], 'utf-8', 'replace')
+        self.header_uuid = bytes(self._view[uuid_offset:uuid_offset + UUID_LEN])
+
+        position = self.header_size
+        if self._view[position:position + 4] != b'TXTB':
+            raise ValueError(f"No BTXT chunk at byte {position}.")
+
+        self.num_char_a = self._u32(position + 4)
+        self.num_char_a_start = position + 8
+        self.num_char_d = self._u32(self.num_char_a_start + len(bs1))
+        self.text_start = self.num_char_a_start + len(bs1) + U32.size
+        self.text_end = self.text_start + self.num_char_d
+        self.num_newlines = self._u32(self.text_end)
+
+        self.num_char_a_end = self.num_char_a_start + self.num_char_a
+        self.table_start = self.text_end + 8
+        self.table_end = self.num_char_a_end - len(bs2)
+        table_size = self.table_end - self.table_start
+        if table_size < 0 or table_size % U32.size:
+            raise ValueError(f"NUM CHAR A ({self.num_char_a}) does not fit NUM CHAR D ({self.num_char_d}) "
+                             f"and a whole NUM CHAR B table.")
+        if self.num_char_a_end + 8 > self.size:
+            raise ValueError(f"NUM CHAR A ({self.num_char_a}) runs past the end of the file.")
+        self.num_lines = table_size // U32.size
+
+        self.num_char_c = self._u32(self.num_char_a_end + 4)
+        self.num_char_c_start = self.num_char_a_end + 8
+        trailer_uuid = self.num_char_c_start + len(TRAILER_PREFIX)
+        self.trailer_uuid = bytes(self._view[trailer_uuid:trailer_uuid + UUID_LEN])
+
+        self.text = self._view[self.text_start:self.text_end]
+        table = self._view[self.table_start:self.table_end]
+        if sys.byteorder == 'little':
+            self.offsets = table.cast('I')
+        else:
+            self.offsets = array('I')
+            self.offsets.frombytes(table)
+            self.offsets.byteswap()
+
+        # UTF-8 takes more than one byte for anything outside ASCII, so only ASCII text has
+        # exactly one byte per counted character plus one CR per line
+        self.is_ascii = self.num_char_d == (self.offsets[-1] if self.num_lines else 0) + self.num_lines
+
+    @property
+    def uuid(self):
+        """
+        The file's UUID as a big-endian byte string, as from `generate_truncated_uuidv7`.
+        """
+        return self.header_uuid[::-1]
+
+    def __len__(self):
+        return self.num_lines
+
+    def _line_ends(self):
+        if self._ends is None:
+            ends = array('Q')
+            find = self._mm.find
+            position = self.text_start
+            for _ in range(self.num_lines):
+                position = find(b'\r', position, self.text_end) + 1
+                if not position:
+                    raise ValueError(f"The text holds fewer CRs than its {self.num_lines} lines.")
+                ends.append(position - self.text_start)
+            self._ends = ends
+        return self._ends
+
+    def line_span(self, index):
+        """
+        Return where a line sits in the text, without its CR.
+
+        Args:
+            index (int): The line number; negative numbers count from the end.
+
+        Returns:
+            tuple: (start, end) byte positions within `text`.
+        """
+        if index < 0:
+            index += self.num_lines
+        if not 0 <= index < self.num_lines:
+            raise IndexError("AVC line index out of range")
+
+        if self.is_ascii:
+            start = (self.offsets[index - 1] + index) if index else 0
+            return start, self.offsets[index] + index
+
+        ends = self._line_ends()
+        start = ends[index - 1] if index else 0
+        return start, ends[index] - 1
+
+    def line_view(self, index):
+        """
+        Return one encoded line, without its CR, without copying it.
+
+        Args:
+            index (int): The line number; negative numbers count from the end.
+
+        Returns:
+            memoryview: The line's UTF-8 bytes.
+        """
+        start, end = self.line_span(index)
+        return self.text[start:end]
+
+    def __getitem__(self, index):
+        """
+        Return one line as text (line breaks inside the line read as LF).
+        """
+        return str(self.line_view(index), 'utf-8')
+
+    def __iter__(self):
+        for index in range(self.num_lines):
+            yield self[index]
+
+    def validate(self, check_lines=True, block_size=CHECK_BLOCK_SIZE):
+        """
+        Check the file against the layout `AVCHeader` and `BTXTChunk` write.
+
+        The length fields, the CR count, the fixed header and trailer bytes and the two copies
+        of the UUID are always checked. With `check_lines`, the text is also decoded a block at
+        a time and every NUM CHAR B entry is compared with the character count of the lines up
+        to it; without it, only the last entry is checked against the size of the text.
+
+        Args:
+            check_lines (bool): Check the NUM CHAR B table line by line.
+            block_size (int): The number of bytes of text decoded at a time.
+
+        Returns:
+            list of str: The problems found; empty when the file is valid.
+        """
+        problems = []
+        template, timestamp_offset, uuid_offset = AVCHeader.compile_template()
+        view = self._view
+
+        # The creator description is left out: other writers may name themselves differently
+        uuid_end = uuid_offset + UUID_LEN
+        fixed = (slice(timestamp_offset + TIMESTAMP_LEN, uuid_offset), slice(uuid_end, uuid_end + HEADER_FOURCC_LEN),
+                 slice(self.header_size - HEADER_PADDING_LEN, self.header_size))
+        if any(view[field] != template[field] for field in fixed):
+            problems.append("The header's fixed fields do not match the AVC header.")
+
+        if view[self.num_char_a_start:self.num_char_a_start + len(bs1)] != bs1:
+            problems.append("The BTXT chunk does not start with the expected marker after NUM CHAR A.")
+        if self.num_newlines != self.num_lines:
+            problems.append(f"The CR count is {self.num_newlines}, but the NUM CHAR B table has {self.num_lines} lines.")
+        if any(view[self.text_end + 4:self.table_start]):
+            problems.append("The padding after the CR count is not zero.")
+        if view[self.table_end:self.num_char_a_end] != conform_byte_string(bs2):
+            problems.append("The bytes after the NUM CHAR B table do not match the AVC layout.")
+        if view[self.num_char_a_end:self.num_char_a_end + 4] != b'tpcS':
+            problems.append(f"No Scpt marker at the end of NUM CHAR A (byte {self.num_char_a_end}).")
+
+        if self.num_char_c != NUM_CHAR_C:
+            problems.append(f"NUM CHAR C is {self.num_char_c}; the AVC trailer is {NUM_CHAR_C} bytes.")
+        num_char_c_end = self.num_char_c_start + self.num_char_c
+        if num_char_c_end != self.size:
+            problems.append(f"NUM CHAR C ends at byte {num_char_c_end}, but the file is {self.size} bytes.")
+        trailer_uuid = self.num_char_c_start + len(TRAILER_PREFIX)
+        if (view[self.num_char_c_start:trailer_uuid] != TRAILER_PREFIX
+                or view[trailer_uuid + UUID_LEN:trailer_uuid + NUM_CHAR_C - len(TRAILER_PREFIX)] != TRAILER_SUFFIX):
+            problems.append("The BTXT trailer does not match the AVC layout.")
+        if self.trailer_uuid != self.header_uuid:
+            problems.append(f"The trailer UUID {self.trailer_uuid[::-1].hex()} does not match the header UUID "
+                            f"{self.uuid.hex()}.")
+
+        if self.num_char_d and self.text[-1] != 0x0D:
+            problems.append("The text does not end in a CR.")
+        if check_lines:
+            self._check_lines(problems, block_size)
+        elif self.num_lines and self.offsets[-1] > self.num_char_d - self.num_lines:
+            problems.append(f"The last NUM CHAR B entry ({self.offsets[-1]}) counts more characters than the text holds.")
+        return problems
+
+    def _check_lines(self, problems, block_size):
+        # Decode whole lines a block at a time and compare their running totals with the table
+        mm = self._mm
+        index = total = 0
+        position = self.text_start
+        while position < self.text_end:
+            end = min(position + block_size, self.text_end)
+            if end < self.text_end:
+                cut = mm.rfind(b'\r', position, end)
+                if cut < 0:
+                    cut = mm.find(b'\r', end, self.text_end)
+                end = cut + 1 if cut >= 0 else self.text_end
+
+            try:
+                text = str(self._view[position:end], 'utf-8')
+            except UnicodeDecodeError as e:
+                problems.append(f"The text is not valid UTF-8 at byte {position + e.start}.")
+                return
+
+            lines = text.split('\r')
+            lines.pop()
+            totals = running_totals(map(len, lines), total)
+            expected = self.offsets[index:index + len(totals)]
+            if len(expected) < len(totals) or expected != totals:
+                bad = next((i for i, (a, b) in enumerate(zip(expected, totals)) if a != b), len(expected))
+                if index + bad >= self.num_lines:
+                    problems.append(f"The text holds more lines than the NUM CHAR B table ({self.num_lines}).")
+                else:
+                    problems.append(f"NUM CHAR B entry {index + bad} is {expected[bad]}, but the lines up to it "
+                                    f"hold {totals[bad]} characters.")
+                return
+            index += len(totals)
+            if totals:
+                total = totals[-1]
+            position = end
+
+        if index != self.num_lines:
+            problems.append(f"The text holds {index} lines, but the NUM CHAR B table has {self.num_lines}.")
+
+    def summary(self):
+        """
+        Return the file's fields as a dict.
+        """
+        return {
+            'path': self.path,
+            'size': self.size,
+            'timestamp': self.timestamp,
+            'uuid': self.uuid.hex(),
+            'lines': self.num_lines,
+            'characters': self.offsets[-1] if self.num_lines else 0,
+            'num_char_a': self.num_char_a,
+            'num_char_c': self.num_char_c,
+            'num_char_d': self.num_char_d,
+            'num_newlines': self.num_newlines,
+        }
+
+    def close(self):
+        """
+        Release the views and unmap the file.
+        """
+        for view in (self.offsets, self.text, self._view):
+            if isinstance(view, memoryview):
+                view.release()
+        self.offsets = self.text = self._view = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                # Views handed out are still alive; the file is unmapped once they are gone
+                pass
+            self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class InspectionResult(namedtuple('InspectionResult', ['path', 'summary', 'problems'])):
+    """
+    The outcome of validating a single .avc file.
+
+    Attributes:
+        path (str): The file that was checked.
+        summary (dict or None): `AVCReader.summary()`, or None if the file could not be parsed.
+        problems (list of str): The problems found; empty when the file is valid.
+    """
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return not self.problems
+
+
+def inspect_file(path, check_lines=True):
+    """
+    Parse and validate one .avc file, collecting errors instead of raising them.
+
+    Args:
+        path (str): The .avc file.
+        check_lines (bool): Check the NUM CHAR B table line by line.
+
+    Returns:
+        InspectionResult: The result.
+    """
+    try:
+        with AVCReader(path) as reader:
+            return InspectionResult(path, reader.summary(), reader.validate(check_lines))
+    except (OSError, ValueError) as e:
+        return InspectionResult(path, None, [str(e)])
+
+
+def _inspect_one(job):
+    # Runs inside a worker process
+    return inspect_file(*job)
+
+
+def inspect_many(paths, jobs=None, check_lines=True):
+    """
+    Validate several .avc files, spreading them across processes.
+
+    Args:
+        paths (iterable of str): The .avc files.
+        jobs (int): The number of worker processes. Defaults to the number of CPUs; 1 checks in-process.
+        check_lines (bool): Check the NUM CHAR B tables line by line.
+
+    Returns:
+        list of InspectionResult: One result per file, in the same order as `paths`.
+    """
+    work = [(path, check_lines) for path in paths]
+    if not work:
+        return []
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(work)))
+
+    if jobs == 1:
+        return [_inspect_one(job) for job in work]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(work) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_inspect_one, work, chunksize=chunksize))
@@ -0,0 +1,322 @@
+import http.client
+import json
+import logging
+import os
+import socket
+import stat
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from . import __version__
+from .core import _validate_input, _validate_output_dir, convert_to_bytes
+from .file import AVCFile
+from .formats import get_format, input_formats
+from .stats import ConversionStats
+from .substitutions import build_substitutions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Inline inputs larger than this are refused
+MAX_REQUEST_SIZE = 256 * 1024 * 1024
+
+
+def _warm_up():
+    # Runs once in each worker process, so the first request doesn't pay for the imports
+    for name in input_formats():
+        get_format(name).load()
+    try:
+        import docx  # noqa: F401
+    except ImportError:
+        pass
+    from .file import AVCHeader
+    AVCHeader.compile_template()
+
+
+def _ready():
+    return os.getpid()
+
+
+def _convert_path(input_path, output_dir, output_name, text_width, cache, substitutions, collect_stats):
+    # Runs in a worker process
+    stats = ConversionStats() if collect_stats else None
+    output_path = AVCFile(input_path, output_dir, output_name, text_width, cache=cache, stats=stats,
+                          substitutions=substitutions).create()
+    return output_path, stats.as_dict() if stats else None
+
+
+def _convert_bytes(data, input_format, text_width, cache, substitutions):
+    # Runs in a worker process
+    return convert_to_bytes(data, input_format, text_width, cache, substitutions=substitutions)
+
+
+class ConversionService:
+    """
+    A pool of warm worker processes that convert on behalf of `pyavc serve`.
+
+    The workers import the input readers and build the header template when they start, and are
+    all started up front, so a request only pays for the conversion itself.
+
+    Args:
+        jobs (int): The number of worker processes. Defaults to the number of CPUs.
+        cache (ConversionCache): Optional cache of encoded bodies shared by the workers.
+    """
+
+    def __init__(self, jobs=None, cache=None):
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache = cache
+        # Forked workers inherit what the server has imported; spawned ones warm up on their own
+        _warm_up()
+        options = {'initializer': _warm_up} if sys.version_info >= (3, 7) else {}
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, **options)
+        # Start every worker now instead of on the first requests
+        for future in [self.executor.submit(_ready) for _ in range(self.jobs)]:
+            future.result()
+
+    def convert_path(self, request):
+        """
+        Convert a file named in a request and write the .avc file next to the others.
+
+        Args:
+            request (dict): 'input' and 'output_dir', plus optional 'output_name', 'text_width',
+                'normalize', 'substitutions' and 'stats'.
+
+        Returns:
+            dict: 'output_path', plus 'stats' when requested.
+        """
+        input_path = request.get('input')
+        output_dir = request.get('output_dir')
+        if not isinstance(input_path, str) or not isinstance(output_dir, str):
+            raise ValueError("'input' and 'output_dir' are required.")
+        _validate_input(input_path)
+        _validate_output_dir(output_dir)
+
+        substitutions = build_substitutions(request.get('normalize', False), request.get('substitutions'))
+        output_path, stats = self.executor.submit(
+            _convert_path, input_path, output_dir, request.get('output_name'), int(request.get('text_width', 80)),
+            self.cache, substitutions, bool(request.get('stats'))).result()
+
+        response = {'output_path': output_path}
+        if stats is not None:
+            response['stats'] = stats
+        return response
+
+    def convert_bytes(self, data, input_format, text_width=80, normalize=False, substitutions=None):
+        """
+        Convert an inline input.
+
+        Returns:
+            bytes: The contents of the .avc file.
+        """
+        substitutions = build_substitutions(normalize, substitutions)
+        return self.executor.submit(_convert_bytes, data, input_format, text_width, self.cache, substitutions).result()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+class ConversionRequestHandler(BaseHTTPRequestHandler):
+    """
+    The HTTP interface of `pyavc serve`.
+
+        GET  /health                  {"ok": true, "version": ..., "workers": ...}
+        POST /convert  (JSON body)    convert a file by path; answers {"output_path": ...}
+        POST /convert?format=docx&text_width=80[&normalize=1][&substitutions=<JSON>]
+                       (raw body)     convert the body itself; answers with the .avc data
+
+    Errors are answered as {"error": ...} with status 400 for bad requests and inputs, and 500
+    for anything else.
+    """
+
+    server_version = f"pyavc/{__version__}"
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            return self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+        self._send_json(200, {'ok': True, 'version': __version__, 'workers': self.server.service.jobs})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/convert':
+            return self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_SIZE:
+            self.close_connection = True
+            return self._send_json(413, {'error': f"Requests are limited to {MAX_REQUEST_SIZE} bytes."})
+        body = self.rfile.read(length)
+
+        try:
+            if self.headers.get_content_type() == 'application/json':
+                self._send_json(200, self.server.service.convert_path(json.loads(body.decode('utf-8'))))
+            else:
+                params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                if not params.get('format'):
+                    return self._send_json(400, {'error': f"Inline inputs need ?format= with one of "
+                                                          f"{', '.join(input_formats())}."})
+                data = self.server.service.convert_bytes(
+                    body, params.get('format'), int(params.get('text_width', 80)),
+                    params.get('normalize') in ('1', 'true'), json.loads(params.get('substitutions', 'null')))
+                self._send(200, 'application/octet-stream', data)
+        except (ValueError, TypeError, OSError) as e:
+            self._send_json(400, {'error': str(e)})
+        except Exception as e:
+            logger.exception("Conversion failed")
+            self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def _send_json(self, status, payload):
+        self._send(status, 'application/json', json.dumps(payload).encode('utf-8'))
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Unix socket clients have no address; log through logging instead of stderr
+        logger.debug("%s", format % args)
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def parse_address(address):
+    """
+    Parse a server address: 'unix:PATH' (or a path containing '/'), 'HOST:PORT', 'http://HOST:PORT' or 'PORT'.
+
+    Returns:
+        tuple: ('unix', path) or ('tcp', (host, port)).
+    """
+    if address.startswith('unix:'):
+        return 'unix', address[len('unix:'):]
+    if address.startswith('http://'):
+        address = urlsplit(address).netloc
+    elif '/' in address:
+        return 'unix', address
+    host, _, port = address.rpartition(':')
+    return 'tcp', (host or DEFAULT_HOST, int(port))
+
+
+def create_server(address, service):
+    """
+    Bind the HTTP server for a `ConversionService`.
+
+    Args:
+        address (str): Where to listen, as for `parse_address`.
+        service (ConversionService): The service that handles the conversions.
+
+    Returns:
+        HTTPServer: The bound server; call `serve_forever()`.
+    """
+    kind, target = parse_address(address)
+    if kind == 'unix':
+        # Replace a socket left behind by a previous server, but never any other file
+        try:
+            if stat.S_ISSOCK(os.stat(target).st_mode):
+                os.remove(target)
+        except FileNotFoundError:
+            pass
+        server = ThreadingUnixHTTPServer(target, ConversionRequestHandler)
+    else:
+        server = ThreadingHTTPServer(target, ConversionRequestHandler)
+    server.service = service
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class ConversionClient:
+    """
+    A thin client for `pyavc serve`. The connection is kept open between requests.
+
+    Args:
+        address (str): The server address, as for `parse_address`.
+        timeout (float): Optional socket timeout in seconds.
+    """
+
+    def __init__(self, address, timeout=None):
+        kind, target = parse_address(address)
+        if kind == 'unix':
+            self.connection = UnixHTTPConnection(target, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(target[0], target[1], timeout=timeout)
+
+    def convert(self, input_path, output_dir, output_name=None, text_width=80, normalize=False, substitutions=None,
+                stats=False):
+        """
+        Convert a file the server can read and write the .avc file into `output_dir`.
+
+        Returns:
+            dict: 'output_path', plus 'stats' when requested.
+        """
+        request = {
+            'input': os.path.abspath(input_path),
+            'output_dir': os.path.abspath(output_dir),
+            'output_name': output_name,
+            'text_width': text_width,
+            'normalize': normalize,
+            'substitutions': substitutions,
+            'stats': stats,
+        }
+        return json.loads(self._request('/convert', json.dumps(request).encode('utf-8'), 'application/json'))
+
+    def convert_bytes(self, data, input_format, text_width=80, normalize=False, substitutions=None):
+        """
+        Convert an inline input on the server.
+
+        Returns:
+            bytes: The contents of the .avc file.
+        """
+        params = {'format': input_format, 'text_width': text_width}
+        if normalize:
+            params['normalize'] = 1
+        if substitutions:
+            params['substitutions'] = json.dumps(substitutions)
+        return self._request('/convert?' + urlencode(params), data, 'application/octet-stream')
+
+    def health(self):
+        self.connection.request('GET', '/health')
+        return json.loads(self._read_response())
+
+    def _request(self, path, body, content_type):
+        self.connection.request('POST', path, body, {'Content-Type': content_type})
+        return self._read_response()
+
+    def _read_response(self):
+        response = self.connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            try:
+                message = json.loads(body.decode('utf-8'))['error']
+            except (ValueError, KeyError):
+                message = body.decode('utf-8', 'replace')
+            if response.status < 500:
+                raise ValueError(message)
+            raise RuntimeError(f"Server error: {message}")
+        return body
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,142 @@
+import time
+
+_hooks = []
+
+
+def register_hook(hook):
+    """
+    Call `hook(stats)` with the `ConversionStats` of every conversion made by `AVCFile` in this process.
+
+    Registering a hook turns stats collection on for all conversions.
+
+    Args:
+        hook (callable): The function to call.
+    """
+    _hooks.append(hook)
+
+
+def unregister_hook(hook):
+    """
+    Remove a hook added with `register_hook`.
+    """
+    _hooks.remove(hook)
+
+
+def hooks_registered():
+    return bool(_hooks)
+
+
+def run_hooks(stats):
+    for hook in list(_hooks):
+        hook(stats)
+
+
+class ConversionStats:
+    """
+    Timings and counters for one conversion.
+
+    Durations are exclusive per stage. The read, wrap and encode stages run as a lazy pipeline,
+    so the clock is handed from stage to stage as items are pulled through it; time spent
+    pulling lines from the wrapper counts as 'wrap', not as 'encode'.
+
+    Stages:
+        cache       hashing the input and looking it up in the conversion cache
+        read        reading the input file or parsing the DOCX into paragraphs
+        substitute  applying text substitutions to paragraphs
+        wrap        wrapping paragraphs into lines
+        encode      encoding lines into the BTXT body
+        write       writing the header, body and offset table to the output
+        name        claiming a unique output path
+
+    Attributes:
+        input_path (str or None): The input path, if the input was a file.
+        output_path (str or None): The created file, when written with `AVCFile.create`.
+        input_format (str): The input format name, e.g. 'txt'.
+        durations (dict): Seconds spent per stage.
+        total_seconds (float): Wall time of the whole conversion.
+        bytes_in (int or None): The size of the input, when known.
+        bytes_out (int): The size of the .avc data.
+        lines (int): The number of text lines written.
+        cache_hit (bool): Whether the encoded body came from the conversion cache.
+    """
+
+    def __init__(self):
+        self.input_path = None
+        self.output_path = None
+        self.input_format = None
+        self.durations = {}
+        self.total_seconds = 0.0
+        self.bytes_in = None
+        self.bytes_out = 0
+        self.lines = 0
+        self.cache_hit = False
+        self._stage = None
+        self._mark = None
+        self._started = None
+
+    def start(self, stage):
+        """
+        Start the clock, charging time to `stage` until another stage takes over.
+        """
+        self._started = self._mark = time.perf_counter()
+        self._stage = stage
+
+    def stop(self):
+        """
+        Stop the clock and record the total wall time.
+        """
+        self.switch(None)
+        self.total_seconds = time.perf_counter() - self._started
+
+    def switch(self, stage):
+        """
+        Charge the time since the last switch to the current stage and make `stage` current.
+
+        Returns:
+            str: The stage that was current before.
+        """
+        now = time.perf_counter()
+        previous = self._stage
+        if previous is not None:
+            self.durations[previous] = self.durations.get(previous, 0.0) + (now - self._mark)
+        self._stage = stage
+        self._mark = now
+        return previous
+
+    def timed(self, iterable, stage):
+        """
+        Wrap an iterator so the time spent producing each item is charged to `stage`.
+
+        Args:
+            iterable (iterable): A lazy pipeline stage.
+            stage (str): The stage name.
+
+        Returns:
+            generator: The same items.
+        """
+        iterator = iter(iterable)
+        while True:
+            previous = self.switch(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.switch(previous)
+            yield item
+
+    def as_dict(self):
+        """
+        Return the stats as a JSON-serialisable dict.
+        """
+        return {
+            'input_path': self.input_path,
+            'output_path': self.output_path,
+            'input_format': self.input_format,
+            'durations': dict(self.durations),
+            'total_seconds': self.total_seconds,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'lines': self.lines,
+            'cache_hit': self.cache_hit,
+        }
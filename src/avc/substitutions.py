@@ -0,0 +1,127 @@
+import json
+import re
+
+# Typographic characters that Avid ScriptSync doesn't match against speech, mapped to plain equivalents
+SCRIPTSYNC_SUBSTITUTIONS = {
+    # Quotes and primes
+    '“': '"',    # Left double quotation mark
+    '”': '"',    # Right double quotation mark
+    '„': '"',    # Double low-9 quotation mark
+    '‟': '"',    # Double high-reversed-9 quotation mark
+    '«': '"',    # Left-pointing double angle quotation mark
+    '»': '"',    # Right-pointing double angle quotation mark
+    '″': '"',    # Double prime
+    '‘': "'",    # Left single quotation mark
+    '’': "'",    # Right single quotation mark
+    '‚': "'",    # Single low-9 quotation mark
+    '‛': "'",    # Single high-reversed-9 quotation mark
+    '′': "'",    # Prime
+    # Dashes and hyphens
+    '‐': '-',    # Hyphen
+    '‑': '-',    # Non-breaking hyphen
+    '‒': '-',    # Figure dash
+    '–': '-',    # En dash
+    '—': '--',   # Em dash
+    '―': '--',   # Horizontal bar
+    '−': '-',    # Minus sign
+    # Ellipsis
+    '…': '...',  # Horizontal ellipsis
+    # Spaces
+    '\u00a0': ' ',    # No-break space
+    '\u2002': ' ',    # En space
+    '\u2003': ' ',    # Em space
+    '\u2007': ' ',    # Figure space
+    '\u2009': ' ',    # Thin space
+    '\u200a': ' ',    # Hair space
+    '\u202f': ' ',    # Narrow no-break space
+    '\u3000': ' ',    # Ideographic space
+    # Invisible characters
+    '\u00ad': '',     # Soft hyphen
+    '\u200b': '',     # Zero width space
+    '\u200c': '',     # Zero width non-joiner
+    '\u200d': '',     # Zero width joiner
+    '\u2060': '',     # Word joiner
+    '\ufeff': '',     # Zero width no-break space (BOM)
+}
+
+class Substitutions:
+    """
+    A set of text substitutions compiled to run in a single pass.
+
+    When every key and replacement is a single character the text goes through `str.translate`.
+    Otherwise all keys are combined into one regular expression, longest first, so a
+    multi-character key wins over any key that is a prefix of it; for mappings that delete or
+    expand characters this is about twice as fast as `str.translate`. Either way each character
+    is looked at once, and the replacement text is never substituted again.
+
+    Args:
+        mapping (dict): {text to find: replacement}.
+    """
+
+    def __init__(self, mapping):
+        self.mapping = dict(mapping)
+        if '' in self.mapping:
+            raise ValueError("Substitution keys must not be empty.")
+
+        self._table = None
+        self._pattern = None
+        if all(len(key) == 1 and len(value) == 1 for key, value in self.mapping.items()):
+            self._table = str.maketrans(self.mapping)
+        else:
+            keys = sorted(self.mapping, key=len, reverse=True)
+            self._pattern = re.compile('|'.join(re.escape(key) for key in keys))
+
+    def __call__(self, text):
+        """
+        Return `text` with every substitution applied.
+        """
+        if self._table is not None:
+            return text.translate(self._table)
+        return self._pattern.sub(lambda match: self.mapping[match.group()], text)
+
+    def __bool__(self):
+        return bool(self.mapping)
+
+    def __reduce__(self):
+        # Recompile in worker processes instead of pickling the compiled tables
+        return (Substitutions, (self.mapping,))
+
+    def fingerprint(self):
+        """
+        Return a stable description of the substitutions, e.g. for cache keys.
+
+        Returns:
+            str: The same string for the same mapping, regardless of key order.
+        """
+        return json.dumps(sorted(self.mapping.items()), ensure_ascii=True)
+
+def build_substitutions(normalize=False, extra=None):
+    """
+    Combine the ScriptSync set with extra substitutions, as chosen on the command line.
+
+    Args:
+        normalize (bool): Start from `SCRIPTSYNC_SUBSTITUTIONS`.
+        extra (dict or iterable of pairs): Substitutions added on top; they win over the ScriptSync set.
+
+    Returns:
+        dict or None: The substitutions, or None when there are none.
+    """
+    substitutions = dict(SCRIPTSYNC_SUBSTITUTIONS) if normalize else {}
+    substitutions.update(extra or ())
+    return substitutions or None
+
+def compile_substitutions(substitutions):
+    """
+    Compile a substitution mapping, passing an already compiled one through.
+
+    Args:
+        substitutions (dict, Substitutions or None): The substitutions.
+
+    Returns:
+        Substitutions or None: None when there is nothing to substitute.
+    """
+    if substitutions is None:
+        return None
+    if not isinstance(substitutions, Substitutions):
+        substitutions = Substitutions(substitutions)
+    return substitutions if substitutions else None
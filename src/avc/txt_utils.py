@@ -0,0 +1,130 @@
+import codecs
+import io
+import mmap
+from itertools import chain
+from .utils import wrap_line
+
+# Bytes of a memory-mapped TXT file decoded at a time
+MMAP_BLOCK_SIZE = 1024 * 1024
+
+def _next_line_end(data, start, end):
+    # Index just past the last line ending in data[start:end], or past the first one after it
+    # when the range holds none. A CRLF is never split. Returns len(data) if there is none left.
+    cut = max(data.rfind(b'\n', start, end), data.rfind(b'\r', start, end))
+    if cut < 0:
+        following = [index for index in (data.find(b'\n', end), data.find(b'\r', end)) if index >= 0]
+        if not following:
+            return len(data)
+        cut = min(following)
+    if data[cut:cut + 2] == b'\r\n':
+        cut += 1
+    return cut + 1
+
+def _iter_mapped_blocks(data, block_size):
+    start = len(codecs.BOM_UTF8) if data[:len(codecs.BOM_UTF8)] == codecs.BOM_UTF8 else 0
+    size = len(data)
+    while start < size:
+        end = _next_line_end(data, start, min(start + block_size, size))
+        block = data[start:end]
+        start = end
+
+        # CR and LF bytes never occur inside a UTF-8 sequence, so line endings can be
+        # normalized before decoding
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        yield io.StringIO(block.decode('utf-8'), newline='\n').readlines()
+
+def iter_mapped_lines(data, block_size=MMAP_BLOCK_SIZE):
+    """
+    Lazily decode the lines of memory-mapped UTF-8 text a block at a time.
+
+    Line boundaries are found on the raw bytes, so only one block is ever held as text. Yields
+    the same lines as reading the file as text: the byte order mark is dropped and CR, LF and
+    CRLF line endings are all read as LF.
+
+    Args:
+        data (mmap or bytes): The encoded text.
+        block_size (int): The approximate number of bytes decoded at a time.
+
+    Returns:
+        iterator of str: The raw lines, including their line endings.
+    """
+    # chain hands out each block's lines without a Python-level step per line
+    return chain.from_iterable(_iter_mapped_blocks(data, block_size))
+
+def iter_txt_file_lines(txt_path):
+    """
+    Lazily read UTF-8 text line by line. A leading byte order mark is dropped, and CR, LF and
+    CRLF line endings are all read as LF.
+
+    Args:
+        txt_path (str, bytes or file object): A file path, the encoded text itself, a binary
+            stream or a text stream. Streams are read from their current position and left open.
+
+    Returns:
+        generator of str: The raw lines, including their line endings.
+    """
+    if isinstance(txt_path, (bytes, bytearray, memoryview)):
+        txt_path = io.BytesIO(txt_path)
+
+    if isinstance(txt_path, io.TextIOBase):
+        first = True
+        for line in txt_path:
+            if first:
+                line = line.lstrip('\ufeff')
+                first = False
+            yield line
+
+    elif hasattr(txt_path, 'read'):
+        txt = io.TextIOWrapper(txt_path, encoding='utf-8-sig')
+        try:
+            yield from txt
+        finally:
+            # Hand the caller's stream back instead of closing it along with the wrapper
+            txt.detach()
+
+    else:
+        with open(txt_path, 'rb') as fp:
+            try:
+                data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                # Empty files, pipes and devices can't be mapped: read them as a stream
+                data = None
+
+            if data is None:
+                yield from io.TextIOWrapper(fp, encoding='utf-8-sig')
+            else:
+                # Decode the mapped file a block at a time instead of line by line
+                with data:
+                    if hasattr(data, 'madvise'):
+                        data.madvise(mmap.MADV_SEQUENTIAL)
+                    yield from iter_mapped_lines(data)
+
+def iter_wrapped_lines(lines, width=80, last=True):
+    """
+    Lazily wrap each input line to the given width.
+
+    Args:
+        lines (iterable of str): The raw lines.
+        width (int): The maximum line width.
+        last (bool): Unused: a TXT line wraps the same wherever it falls. Accepted so this can be
+            registered as the TXT format's wrapper (see `avc.formats`).
+
+    Returns:
+        generator of str: The wrapped lines.
+    """
+    for line in lines:
+        yield from wrap_line(line, width)
+
+def iter_txt_lines(txt_path, width=80):
+    """
+    Read and wrap a UTF-8 text file as a lazy pipeline, so only one input line is held at a time.
+
+    Args:
+        txt_path (str, bytes or file object): The text source, as for `iter_txt_file_lines`.
+        width (int): The maximum line width.
+
+    Returns:
+        generator of str: The wrapped lines.
+    """
+    return iter_wrapped_lines(iter_txt_file_lines(txt_path), width)
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from .cache import HASH_BLOCK_SIZE
+from .file import AVCFile
+from .formats import format_from_path
+
+MANIFEST_NAME = '.pyavc-manifest.json'
+
+
+def file_digest(path):
+    """
+    Return the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _reconvert(input_path, previous_output, previous_digest, output_dir, text_width, cache):
+    # Runs in a worker process. Returns (digest, output path, whether anything was written).
+    digest = file_digest(input_path)
+    if previous_output and os.path.exists(previous_output):
+        if digest == previous_digest:
+            # Saved without changes: the existing output is still current
+            return digest, previous_output, False
+
+        # Replace our own earlier output in place, atomically, so editors never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=output_dir, prefix='.tmp-', suffix='.avc')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                AVCFile(input_path, text_width=text_width, cache=cache).write(fp)
+            os.replace(tmp_path, previous_output)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return digest, previous_output, True
+
+    output_path = AVCFile(input_path, output_dir, None, text_width, cache=cache).create()
+    return digest, output_path, True
+
+
+class Watcher:
+    """
+    Watches a folder and incrementally converts new or modified script files (.txt, .docx, .fdx, ...) into an output folder.
+
+    A manifest in the output folder records each input's size, mtime, content hash and the .avc it
+    produced, so restarts only convert what changed while the watcher was down, saves that don't
+    change the content are skipped, and a modified script replaces its previous .avc instead of
+    producing "name(1).avc". A file is converted once its size and mtime have been stable for
+    `debounce` seconds, so a burst of saves yields a single conversion.
+
+    The folder is polled with a single directory scan every `interval` seconds, which keeps an idle
+    watcher close to zero CPU while giving sub-second change-to-output latency. Conversions run in a
+    process pool so a large document doesn't delay the others.
+
+    Args:
+        input_dir (str): The folder to watch.
+        output_dir (str): The folder .avc files are written to.
+        text_width (int): The maximum line width used when wrapping text.
+        jobs (int): The number of worker processes. Defaults to the number of CPUs.
+        interval (float): Seconds between scans.
+        debounce (float): Seconds a file must be unchanged before it is converted.
+        cache (ConversionCache): Optional cache of encoded bodies.
+        on_result (callable): Called as on_result(input_path, output_path, error) after each conversion.
+    """
+
+    def __init__(self, input_dir, output_dir, text_width=80, jobs=None, interval=0.25, debounce=0.3,
+                 cache=None, on_result=None):
+        self.input_dir = os.path.abspath(input_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.text_width = text_width
+        self.jobs = jobs
+        self.interval = interval
+        self.debounce = debounce
+        self.cache = cache
+        self.on_result = on_result
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        self._pending = {}
+        self._in_flight = {}
+        self._failed = {}
+        self._executor = None
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as fp:
+                manifest = json.load(fp)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return manifest.get('files', {}) if isinstance(manifest, dict) else {}
+
+    def _save_manifest(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, prefix='.tmp-', suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            json.dump({'input_dir': self.input_dir, 'files': self.manifest}, fp, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def scan(self):
+        """
+        List the convertible files in the input folder.
+
+        Returns:
+            dict: {file name: (size, mtime_ns)}.
+        """
+        found = {}
+        with os.scandir(self.input_dir) as it:
+            for entry in it:
+                # Skip editor lock/temp files such as "~$script.docx" and ".~lock"
+                if entry.name.startswith(('~$', '.')) or not format_from_path(entry.name):
+                    continue
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        found[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+        return found
+
+    def poll(self, now=None):
+        """
+        Scan once, start conversions for files that have settled, and collect finished ones.
+
+        Returns:
+            int: The number of conversions started.
+        """
+        now = time.monotonic() if now is None else now
+        self._collect()
+
+        found = self.scan()
+        changed = False
+        for name in list(self.manifest):
+            if name not in found:
+                # Deleted inputs are forgotten; their .avc files are left alone
+                del self.manifest[name]
+                changed = True
+        for name in list(self._pending):
+            if name not in found:
+                del self._pending[name]
+        if changed:
+            self._save_manifest()
+
+        started = 0
+        for name, stat in found.items():
+            if name in self._in_flight:
+                continue
+            record = self.manifest.get(name)
+            if record is not None and (record['size'], record['mtime_ns']) == stat:
+                continue
+            if self._failed.get(name) == stat:
+                # Failed before and hasn't changed since; don't retry in a loop
+                continue
+
+            # Debounce: wait until the file has stopped changing
+            seen = self._pending.get(name)
+            if seen is None or seen[0] != stat:
+                self._pending[name] = (stat, now)
+                if self.debounce > 0:
+                    continue
+            elif now - seen[1] < self.debounce:
+                continue
+
+            del self._pending[name]
+            self._submit(name, stat, record)
+            started += 1
+
+        return started
+
+    def _submit(self, name, stat, record):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+
+        previous_output = record.get('output') if record else None
+        previous_digest = record.get('sha256') if record else None
+        future = self._executor.submit(_reconvert, os.path.join(self.input_dir, name), previous_output,
+                                       previous_digest, self.output_dir, self.text_width, self.cache)
+        self._in_flight[name] = (future, stat)
+
+    def _collect(self):
+        changed = False
+        for name, (future, stat) in list(self._in_flight.items()):
+            if not future.done():
+                continue
+            del self._in_flight[name]
+            input_path = os.path.join(self.input_dir, name)
+            try:
+                digest, output_path, written = future.result()
+            except Exception as e:
+                # Leave it out of the manifest so the next change (or restart) retries it
+                self._failed[name] = stat
+                self._report(input_path, None, f"{type(e).__name__}: {e}")
+                continue
+
+            self.manifest[name] = {'size': stat[0], 'mtime_ns': stat[1], 'sha256': digest, 'output': output_path}
+            changed = True
+            if written:
+                self._report(input_path, output_path, None)
+        if changed:
+            self._save_manifest()
+
+    def _report(self, input_path, output_path, error):
+        if self.on_result is not None:
+            self.on_result(input_path, output_path, error)
+
+    def run(self, stop=None):
+        """
+        Poll until `stop()` returns True (or forever), then wait for running conversions.
+
+        Args:
+            stop (callable): Optional function checked before every scan.
+        """
+        try:
+            while stop is None or not stop():
+                self.poll()
+                time.sleep(self.interval)
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Wait for running conversions, record them in the manifest and shut the worker pool down.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._collect()
+            self._executor = None